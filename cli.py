@@ -0,0 +1,197 @@
+"""
+command-line interface for 'rental'.
+
+python cli.py friends list
+python cli.py borrow FRIEND_ID BELONGING_ID [--when DATETIME]
+python cli.py return BORROW_ID [--when DATETIME]
+python cli.py overdue
+python cli.py sync
+
+Token is taken from --token or MINTAL_TOKEN environment variable.
+Read-only commands (friends list, overdue) are answered from local cache
+made by 'sync' if it exists, so neither network nor requests are touched.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+CACHE_PATH = os.path.join(
+    os.path.expanduser('~'), '.cache', 'mintal', 'cache.json'
+    )
+
+
+def read_cache(path):
+    """read local cache, None if there is no cache."""
+    try:
+        with open(path, encoding='utf-8') as cache_file:
+            return json.load(cache_file)
+    except (OSError, ValueError):
+        return None
+
+
+def write_cache(path, cache):
+    """write local cache atomically."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as cache_file:
+        json.dump(cache, cache_file)
+    os.replace(tmp_path, path)
+
+
+def parse_when(when_string):
+    """parse --when argument into datetime or None."""
+    if when_string:
+        from datetime import datetime as dt
+        return dt.fromisoformat(when_string)
+
+
+def get_user(args, cache=None, *sections):
+    """make user object with token and cached things."""
+    from mintal import User
+    user = User()
+    user.token = args.token
+    if cache:
+        user.load_cache(cache, *sections)
+    return user
+
+
+def print_borrowings(borrowings):
+    for borrow in borrowings:
+        print(f'{borrow.id}\t{borrow.what.name}\t{borrow.who.name}')
+
+
+# commands
+def friends_list(args):
+    cache = None if args.no_cache else read_cache(args.cache)
+    user = get_user(args, cache, 'friends')
+    if cache is None:
+        if not args.token:
+            return 'token is required without local cache'
+        user.get_all_friends()
+    for friend in user._friends.values():
+        mark = '\toverdue' if friend.overdue else ''
+        print(f'{friend.id}\t{friend.name}{mark}')
+
+
+def overdue(args):
+    cache = None if args.no_cache else read_cache(args.cache)
+    if cache is None:
+        if not args.token:
+            return 'token is required without local cache'
+        user = get_user(args)
+        user.get_all_friends()
+        user.get_all_belongings()
+        borrowings = user.get_overdue() or []
+    else:
+        user = get_user(args, cache, 'borrowings')
+        borrowings = [user.borrow_by_id(borrow_id)
+                      for borrow_id in cache.get('overdue', [])]
+    print_borrowings(borrowings)
+
+
+def borrow(args):
+    if not args.token:
+        return 'token is required'
+    cache = None if args.no_cache else read_cache(args.cache)
+    user = get_user(args, cache)
+    friend = user.friend_by_id(args.friend_id)
+    belonging = user.belonging_by_id(args.belonging_id)
+    borrow = user.borrow_to(friend, belonging, parse_when(args.when))
+    if borrow is None:
+        return 'borrow was not made'
+    print_borrowings([borrow])
+    if cache is not None:
+        # as application does, cached answers stay right till sync
+        borrow.what.borrowed = True
+        update_cache(args.cache, user, cache.get('overdue', []))
+
+
+def borrow_return(args):
+    if not args.token:
+        return 'token is required'
+    cache = None if args.no_cache else read_cache(args.cache)
+    user = get_user(args, cache)
+    borrow = user.borrow_by_id(args.borrow_id)
+    if user.borrow_return(borrow, parse_when(args.when)) is None:
+        return 'borrow was not returned'
+    print_borrowings([borrow])
+    if cache is not None:
+        # as application does, cached answers stay right till sync
+        overdue_ids = [borrow_id for borrow_id in cache.get('overdue', [])
+                       if borrow_id != borrow.id]
+        borrow.what.borrowed = False
+        borrow.who.overdue = any(
+            user.borrow_by_id(borrow_id).who is borrow.who
+            for borrow_id in overdue_ids
+            )
+        update_cache(args.cache, user, overdue_ids)
+
+
+def sync(args):
+    if not args.token:
+        return 'token is required'
+    user = get_user(args)
+    user.get_all_friends()
+    user.get_all_belongings()
+    user.get_all_borrowings()
+    overdue_borrowings = user.get_overdue() or []
+    update_cache(args.cache, user,
+                 [borrow.id for borrow in overdue_borrowings])
+    print(f'friends: {user.number_friends()}, '
+          f'belongings: {user.number_belongings()}, '
+          f'borrowings: {len(user._borrowings)}')
+    for thing, stats in user.transfer_stats.items():
+        print(f'{thing}: {stats}')
+
+
+def update_cache(path, user, overdue_ids):
+    cache = user.dump_cache()
+    cache['overdue'] = overdue_ids
+    write_cache(path, cache)
+
+
+def make_parser():
+    parser = argparse.ArgumentParser(prog='mintal')
+    parser.add_argument('--token', default=os.environ.get('MINTAL_TOKEN'))
+    parser.add_argument(
+        '--cache', default=os.environ.get('MINTAL_CACHE', CACHE_PATH)
+        )
+    parser.add_argument('--no-cache', action='store_true',
+                        help='ask application even if local cache exists')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    friends = commands.add_parser('friends')
+    friends_commands = friends.add_subparsers(dest='action', required=True)
+    friends_commands.add_parser('list').set_defaults(func=friends_list)
+
+    borrow_parser = commands.add_parser('borrow')
+    borrow_parser.add_argument('friend_id', type=int)
+    borrow_parser.add_argument('belonging_id', type=int)
+    borrow_parser.add_argument('--when')
+    borrow_parser.set_defaults(func=borrow)
+
+    return_parser = commands.add_parser('return')
+    return_parser.add_argument('borrow_id', type=int)
+    return_parser.add_argument('--when')
+    return_parser.set_defaults(func=borrow_return)
+
+    commands.add_parser('overdue').set_defaults(func=overdue)
+    commands.add_parser('sync').set_defaults(func=sync)
+    return parser
+
+
+def main(argv=None):
+    args = make_parser().parse_args(argv)
+    error = args.func(args)
+    if error:
+        print(error, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
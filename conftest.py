@@ -0,0 +1,89 @@
+import copy
+import json
+
+import pytest
+
+CACHE = {
+    'username': 'djoser',
+    'friends': [
+        {'id': 1, 'name': 'John Doe', 'has_overdue': False},
+        {'id': 2, 'name': 'Sam Wilson', 'has_overdue': False},
+        ],
+    'belongings': [
+        {'id': 1, 'name': 'umbrella', 'is_borrowed': False},
+        {'id': 2, 'name': 'hammer', 'is_borrowed': False},
+        ],
+    'borrowings': [],
+    }
+
+
+class FakeResponse:
+
+    def __init__(self, reply, links=None):
+        self.content = json.dumps(reply).encode('utf-8')
+        self.links = links or {}
+        self._reply = reply
+
+    def __bool__(self):
+        return True
+
+    def json(self):
+        return self._reply
+
+
+class FakeApplication:
+    """
+    answer instead of application from things of cache, remember
+    requests as (method, url, data).
+
+    Things are copied, so tests may change them.
+    """
+
+    def __init__(self, cache=CACHE):
+        self.online = True
+        self.requests = []
+        self.things = {
+            section: {data['id']: dict(data)
+                      for data in cache.get(section, [])}
+            for section in ('friends', 'belongings', 'borrowings')
+            }
+
+    @staticmethod
+    def _parse(url):
+        section, thing_id = url.rstrip('/').split('/')[-2:]
+        return section, int(thing_id)
+
+    def get(self, url, param=None):
+        self.requests.append(('get', url, param))
+        section, thing_id = self._parse(url)
+        return FakeResponse(dict(self.things[section][thing_id]))
+
+    def post(self, url, data=None, headers=None, raise_rejected=False):
+        if not self.online:
+            return None
+        self.requests.append(('post', url, data))
+        borrowings = self.things['borrowings']
+        borrow_id = max(borrowings, default=0) + 1
+        borrowings[borrow_id] = {
+            'id': borrow_id, 'what': data['what'], 'to_who': data['to_who'],
+            'when': '2020-01-12T17:15:00.000000Z', 'returned': None,
+            }
+        return dict(borrowings[borrow_id])
+
+    def patch(self, url, data, headers=None, raise_rejected=False):
+        if not self.online:
+            return None
+        self.requests.append(('patch', url, data))
+        section, thing_id = self._parse(url)
+        self.things[section][thing_id].update(data)
+        return dict(self.things[section][thing_id])
+
+
+@pytest.fixture
+def cache():
+    """copy of CACHE which test may change."""
+    return copy.deepcopy(CACHE)
+
+@pytest.fixture
+def application(cache):
+    return FakeApplication(cache)
@@ -1,5 +1,5 @@
 import datetime as dt
-import pytz
+# pytz is imported inside functions: it is heavy for command-line usage
 
 TIMEZONE = 'Europe/Moscow'
 
@@ -47,6 +47,7 @@ def convert_datetime(some_datetime):
         dt_return = dt.datetime.fromtimestamp(some_datetime)
     elif isinstance(some_datetime, str):
         if 'Z' == some_datetime[-1]:
+            import pytz
             dt_string = some_datetime[:-1]
             dt_utc = pytz.utc.localize(dt.datetime.fromisoformat(dt_string))
             dt_return = dt_utc.astimezone(pytz.timezone(TIMEZONE))
@@ -56,6 +57,7 @@ def convert_datetime(some_datetime):
 
 def local_datetime(some_datetime):
     """localize to timezone."""
+    import pytz
     tz = pytz.timezone(TIMEZONE)
     if some_datetime.tzinfo is None:
         dta = tz.localize(some_datetime)
@@ -68,6 +70,11 @@ def local_datetime_string(some_datetime):
     dta = local_datetime(some_datetime)
     return dta.isoformat(timespec='microseconds')
 
+def utc_datetime_string(some_datetime):
+    """make ISO format in UTC with 'Z' suffix (as application does)."""
+    dta = local_datetime(some_datetime).astimezone(dt.timezone.utc)
+    return dta.replace(tzinfo=None).isoformat(timespec='microseconds') + 'Z'
+
 def format_datetime_string(some_datetime):
     """format datetime to string HH:MM DD-MM-YYYY"""
     return dt.datetime.strftime(some_datetime, '%H:%M %d-%m-%Y')
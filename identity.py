@@ -0,0 +1,97 @@
+"""
+bounded identity map for things of user.
+
+Recently used things are kept by strong references in LRU order up to
+max_entries things or max_bytes of memory. Evicted things are remembered
+by weak references: while they are still used (for example by live
+Borrow objects) the same object is returned, otherwise it must be fetched
+again.
+"""
+
+import sys
+import weakref
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+
+def sizeof(thing):
+    """estimate memory taken by thing object."""
+    size = sys.getsizeof(thing)
+    attributes = getattr(thing, '__dict__', None)
+    if attributes is not None:
+        size += sys.getsizeof(attributes)
+        size += sum(sys.getsizeof(value) for value in attributes.values()
+                    if isinstance(value, str))
+    return size
+
+
+class IdentityMap(MutableMapping):
+    """
+    dict of things by id with LRU eviction.
+
+    max_entries : int quantity of things kept, None - no limit.
+    max_bytes : int memory budget for things kept, None - no limit.
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._recent = OrderedDict()
+        self._sizes = {}
+        self._bytes = 0
+        self._alive = weakref.WeakValueDictionary()
+
+    def __getitem__(self, thing_id):
+        if thing_id in self._recent:
+            self._recent.move_to_end(thing_id)
+            return self._recent[thing_id]
+        # evicted, but still in use
+        thing = self._alive[thing_id]
+        self._keep(thing_id, thing)
+        return thing
+
+    def __setitem__(self, thing_id, thing):
+        self._alive[thing_id] = thing
+        self._keep(thing_id, thing)
+
+    def __delitem__(self, thing_id):
+        del self._alive[thing_id]
+        self._forget(thing_id)
+
+    def __contains__(self, thing_id):
+        return thing_id in self._recent or thing_id in self._alive
+
+    def __iter__(self):
+        return iter(list(self._alive.keys()))
+
+    def __len__(self):
+        return len(self._alive)
+
+    def values(self):
+        """things without changing LRU order."""
+        return list(self._alive.values())
+
+    def items(self):
+        """pairs of id and thing without changing LRU order."""
+        return list(self._alive.items())
+
+    def _keep(self, thing_id, thing):
+        self._forget(thing_id)
+        self._recent[thing_id] = thing
+        if self.max_bytes is not None:
+            self._sizes[thing_id] = sizeof(thing)
+            self._bytes += self._sizes[thing_id]
+        self._evict()
+
+    def _forget(self, thing_id):
+        if self._recent.pop(thing_id, None) is not None:
+            self._bytes -= self._sizes.pop(thing_id, 0)
+
+    def _evict(self):
+        while len(self._recent) > 1 and (
+                (self.max_entries is not None
+                 and len(self._recent) > self.max_entries)
+                or (self.max_bytes is not None
+                    and self._bytes > self.max_bytes)):
+            thing_id, _ = self._recent.popitem(last=False)
+            self._bytes -= self._sizes.pop(thing_id, 0)
@@ -0,0 +1,269 @@
+"""
+write-behind journal for changes of borrowings.
+
+Every change is appended to a local file (JSON lines) and pushed to
+application later by background thread, so changes survive outages.
+Changes which application rejects are kept apart as dead letters,
+the others are pushed again until they get through.
+"""
+
+import json
+import os
+import threading
+import uuid
+
+# 4xx statuses which may pass later: token renewed, timeout, rate limit
+TRANSIENT_STATUSES = {401, 408, 429}
+# the longest pause of background pushing after failures, seconds
+MAX_BACKOFF = 60.0
+
+
+class Rejected(Exception):
+    """application rejected change, pushing it again won't help."""
+
+
+def is_rejection(response):
+    """check if error response means that change is rejected for good."""
+    if response is None:
+        return False
+    status = response.status_code
+    return 400 <= status < 500 and status not in TRANSIENT_STATUSES
+
+
+class Journal:
+    """durable append-only journal of changes."""
+
+    def __init__(self, path):
+        self._path = path
+        self._lock = threading.Lock()
+        self._entries = []
+        self._done = {}
+        self._rejected = []
+        self._replay()
+
+    def _replay(self):
+        """read journal file, keep entries which weren't pushed."""
+        entries = []
+        # size of complete records
+        size = 0
+        try:
+            with open(self._path, 'rb') as journal_file:
+                for line in journal_file:
+                    try:
+                        if not line.endswith(b'\n'):
+                            raise ValueError('record is not complete')
+                        record = json.loads(line)
+                    except ValueError:
+                        # torn write at the end of file
+                        break
+                    size += len(line)
+                    if record.get('done'):
+                        self._done[record['key']] = record.get('id')
+                    elif record.get('rejected'):
+                        self._done[record['key']] = None
+                        self._rejected.append(record)
+                    else:
+                        entries.append(record)
+        except FileNotFoundError:
+            return
+        if os.path.getsize(self._path) > size:
+            # new records mustn't be glued to torn one
+            os.truncate(self._path, size)
+        self._entries = [
+            entry for entry in entries if entry['key'] not in self._done
+            ]
+
+    def _write(self, record):
+        with open(self._path, 'a', encoding='utf-8') as journal_file:
+            journal_file.write(json.dumps(record) + '\n')
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+
+    def _rewrite(self):
+        """leave only dead letters in journal file."""
+        tmp_path = f'{self._path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as journal_file:
+            for record in self._rejected:
+                journal_file.write(json.dumps(record) + '\n')
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+        os.replace(tmp_path, self._path)
+
+    def append(self, operation, data, things=None, after=None):
+        """
+        append change into journal, return new entry.
+
+        data : dict sent to application.
+        things : dict of data of things before change, they let to apply
+        change without application and to undo it.
+        after : key of entry this one depends on.
+        """
+        entry = {
+            'key': uuid.uuid4().hex,
+            'operation': operation,
+            'data': data,
+            'things': things or {},
+            'after': after,
+            }
+        with self._lock:
+            self._write(entry)
+            self._entries.append(entry)
+        return entry
+
+    def pending(self, limit=None):
+        """get entries which weren't pushed yet (in order)."""
+        with self._lock:
+            return list(self._entries[:limit])
+
+    def done_id(self, key):
+        """get id given by application for pushed entry."""
+        with self._lock:
+            return self._done.get(key)
+
+    def mark_done(self, key, thing_id=None):
+        """note that entry was pushed to application."""
+        with self._lock:
+            self._write({'key': key, 'done': True, 'id': thing_id})
+            self._done[key] = thing_id
+            self._entries = [
+                entry for entry in self._entries if entry['key'] != key
+                ]
+            self._compact()
+
+    def _compact(self):
+        if not self._entries:
+            # nothing refers to pushed entries any more
+            self._rewrite()
+            self._done = {}
+
+    def reject(self, key, reason):
+        """
+        move entry and entries depending on it to dead letters.
+
+        return rejected entries, the latest first (order to undo them).
+        """
+        with self._lock:
+            keys = {key}
+            rejected = []
+            for entry in self._entries:
+                if entry['key'] in keys or entry.get('after') in keys:
+                    keys.add(entry['key'])
+                    rejected.append(entry)
+            for entry in rejected:
+                record = {'key': entry['key'], 'rejected': True,
+                          'reason': reason, 'entry': entry}
+                self._write(record)
+                self._rejected.append(record)
+                self._done[entry['key']] = None
+            self._entries = [
+                entry for entry in self._entries if entry['key'] not in keys
+                ]
+            self._compact()
+        return rejected[::-1]
+
+    def rejected(self):
+        """get dead letters: dicts with rejected 'entry' and 'reason'."""
+        with self._lock:
+            return [{'entry': record['entry'], 'reason': record['reason']}
+                    for record in self._rejected]
+
+    def forget_rejected(self):
+        """drop dead letters."""
+        with self._lock:
+            self._rejected = []
+            if not self._entries:
+                self._rewrite()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class WriteBehind:
+    """
+    push journal entries to application in batches.
+
+    send : function(entry), return id of thing or None if push failed
+    and should be repeated, raise Rejected if application rejected it.
+    Other errors of send are printed and entry is pushed again, send
+    should return id if entry was pushed even if it failed after.
+    undo : function(entry), called for every rejected entry.
+    """
+
+    def __init__(self, path, send, undo, batch_size=20, interval=1.0):
+        self.journal = Journal(path)
+        self._send = send
+        self._undo = undo
+        self._batch_size = batch_size
+        self._interval = interval
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def append(self, operation, data, things=None, after=None):
+        entry = self.journal.append(operation, data, things, after)
+        if len(self.journal) >= self._batch_size:
+            self._wakeup.set()
+        return entry
+
+    def flush(self):
+        """push pending entries, return True if journal is empty."""
+        with self._flush_lock:
+            while True:
+                batch = self.journal.pending(self._batch_size)
+                if not batch:
+                    return True
+                for entry in batch:
+                    try:
+                        thing_id = self._send(entry)
+                    except Rejected as error:
+                        for rejected in self.journal.reject(
+                                entry['key'], str(error)):
+                            self._undo_rejected(rejected)
+                        # dependent entries of batch are rejected too
+                        break
+                    except Exception as error:
+                        # entry is pushed again with the same key
+                        print(f'Unexpected error occurred {error}')
+                        return False
+                    if thing_id is None:
+                        return False
+                    self.journal.mark_done(entry['key'], thing_id)
+
+    def _undo_rejected(self, entry):
+        try:
+            self._undo(entry)
+        except Exception as error:
+            print(f'Unexpected error occurred {error}')
+
+    def _run(self):
+        """push journal until closed, pause longer after every failure."""
+        pause = self._interval
+        while not self._stopped.is_set():
+            self._wakeup.wait(pause)
+            self._wakeup.clear()
+            try:
+                pushed = self.flush()
+            except Exception as error:
+                print(f'Unexpected error occurred {error}')
+                pushed = False
+            if pushed:
+                pause = self._interval
+            else:
+                pause = min(pause * 2, max(MAX_BACKOFF, self._interval))
+
+    def start(self):
+        """start background flushing."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def close(self):
+        """stop background flushing and push the rest of journal."""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        return self.flush()
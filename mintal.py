@@ -4,10 +4,14 @@ rev.01
 """
 
 import abc
+import threading
+from contextlib import contextmanager
 from datetime import datetime as dt
-import requests
-from requests.exceptions import HTTPError
-from datetools import convert_datetime, local_datetime_string
+from time import perf_counter
+from datetools import (
+    convert_datetime, local_datetime_string, utc_datetime_string,
+    )
+from search import NameIndex
 
 
 BASE_URL = 'http://localhost:8000/api/'
@@ -18,6 +22,21 @@ URLS = {
     'borrowings': 'v1/borrowings/',
     }
 
+# attributes of things and their fields in application
+FIELDS = {
+    'name': 'name',
+    'overdue': 'has_overdue',
+    'borrowed': 'is_borrowed',
+    'when': 'when',
+    'returned': 'returned',
+    'what': 'what',
+    'who': 'to_who',
+    }
+
+# seconds while changes of shared cache made by other processes
+# aren't looked for, every lookup in cache would query it otherwise
+SHARED_REFRESH = 0.01
+
 class Thing(metaclass=abc.ABCMeta):
     """abstract class for things in application."""
     def __init__(self, user, name=''):
@@ -41,6 +60,19 @@ class Thing(metaclass=abc.ABCMeta):
     def name(self):
         return self._name
 
+    @name.setter
+    def name(self, name):
+        self._set('name', str(name))
+        if self._user is not None:
+            self._user._index_thing(self)
+
+    def _set(self, field, value):
+        """set value of field, note change for user's session."""
+        old_value = getattr(self, f'_{field}')
+        setattr(self, f'_{field}', value)
+        if self._user is not None and old_value != value:
+            self._user._track(self, field, old_value)
+
     @abc.abstractmethod
     def load_data(self, data):
         """load data from database into object."""
@@ -59,7 +91,8 @@ class Friend(Thing):
         return f'<Friend object: Friend.name = {self._name}>'
 
     def load_data(self, data):
-        self._user._load_friend_data(self, data)
+        with self._user._untracked():
+            self._user._load_friend_data(self, data)
 
     @property
     def overdue(self):
@@ -68,10 +101,10 @@ class Friend(Thing):
     @overdue.setter
     def overdue(self, has_overdue):
         if isinstance(has_overdue, bool):
-            self._overdue = has_overdue
+            self._set('overdue', has_overdue)
         else:
             bool_overdue = bool(has_overdue)
-            self._overdue = bool_overdue
+            self._set('overdue', bool_overdue)
 
 
 class Belonging(Thing):
@@ -87,7 +120,8 @@ class Belonging(Thing):
         return f'<Belonging object: Belonging.name = {self._name}>'
 
     def load_data(self, data):
-        self._user._load_belonging_data(self, data)
+        with self._user._untracked():
+            self._user._load_belonging_data(self, data)
 
     @property
     def borrowed(self):
@@ -96,10 +130,10 @@ class Belonging(Thing):
     @borrowed.setter
     def borrowed(self, is_borrowed):
         if isinstance(is_borrowed, bool):
-            self._borrowed = is_borrowed
+            self._set('borrowed', is_borrowed)
         else:
             bool_borrowed = bool(is_borrowed)
-            self._borrowed = bool_borrowed
+            self._set('borrowed', bool_borrowed)
 
 
 class Borrow(Thing):
@@ -118,7 +152,8 @@ class Borrow(Thing):
         return f'<Borrow object: Borrow.id = {self._id}>'
 
     def load_data(self, data):
-        self._user._load_borrow_data(self, data)
+        with self._user._untracked():
+            self._user._load_borrow_data(self, data)
 
     @property
     def returned(self):
@@ -128,7 +163,7 @@ class Borrow(Thing):
     def returned(self, returned_date):
         if returned_date:
             dt_return = convert_datetime(returned_date)
-            self._returned = dt_return
+            self._set('returned', dt_return)
 
     @property
     def when(self):
@@ -138,7 +173,7 @@ class Borrow(Thing):
     def when(self, when_date):
         if when_date:
             dt_when = convert_datetime(when_date)
-            self._when = dt_when
+            self._set('when', dt_when)
 
     @property
     def who(self):
@@ -147,7 +182,7 @@ class Borrow(Thing):
     @who.setter
     def who(self, to_friend):
         if isinstance(to_friend, Friend):
-            self._who = to_friend
+            self._set('who', to_friend)
         else:
             raise TypeError('to_friend should be Friend object')
 
@@ -158,7 +193,7 @@ class Borrow(Thing):
     @what.setter
     def what(self, thing):
         if isinstance(thing, Belonging):
-            self._what = thing
+            self._set('what', thing)
         else:
             raise TypeError('thing argument should be Belonging object')
 
@@ -166,13 +201,35 @@ class Borrow(Thing):
 class User:
     """user class for working with 'rental'."""
 
-    def __init__(self):
+    def __init__(self, max_entries=None, max_bytes=None):
+        """
+        max_entries : int quantity of each kind of things kept in memory.
+        max_bytes : int memory budget for each kind of things.
+        Without limits things are kept forever, else the least recently
+        used ones are evicted and fetched again when needed.
+        """
         self._id = 0
         self._username = ''
-        self._friends = {}
-        self._belongings = {}
-        self._borrowings = {}
+        self._friends = self._make_package(max_entries, max_bytes)
+        self._belongings = self._make_package(max_entries, max_bytes)
+        self._borrowings = self._make_package(max_entries, max_bytes)
         self._token = None
+        self._write_behind = None
+        self._pending_borrowings = {}
+        # guards things shared with write-behind thread
+        self._lock = threading.RLock()
+        self.page_sizers = {}
+        self.transfer_stats = {}
+        self._session = None
+        self._local = threading.local()
+        self._name_index = NameIndex()
+        self._shared = None
+        self._shared_version = 0
+        self._shared_interval = 0
+        self._shared_checked = None
+        self._stale = set()
+        self._timelines = None
+        self._timeline_keys = {}
 
     def login(self, username, password):
         """get token."""
@@ -215,6 +272,21 @@ class User:
     def token(self, token_value):
         self._token = token_value
 
+    def _page_sizer(self, thing):
+        """get page sizer of list of things, one for each list."""
+        if thing not in self.page_sizers:
+            from transfer import PageSizer
+            self.page_sizers[thing] = PageSizer()
+        return self.page_sizers[thing]
+
+    @staticmethod
+    def _make_package(max_entries, max_bytes):
+        """make dict of things, bounded if there are limits."""
+        if max_entries is None and max_bytes is None:
+            return {}
+        from identity import IdentityMap
+        return IdentityMap(max_entries, max_bytes)
+
     def _create_thing(self, thing):
         """create an instance of specific thing object."""
         if thing.lower() == 'friend':
@@ -243,43 +315,114 @@ class User:
         url : API request
         package : dict of objects of things
         thing : str name of object (friend, belonging)
+
+        Page size is chosen by page_sizers[thing] from measured pages,
+        transfer statistics are kept in transfer_stats[thing].
         """
+        from transfer import TransferStats
+        stats = TransferStats()
+        self.transfer_stats[thing] = stats
+        sizer = self._page_sizer(thing)
+        # maximum page size allowed by application in this sync
+        max_size = sizer.max_size
+        params = None
+        # things fetched so far, start of requested page
+        offset = start = 0
         while url:
-            response = self._get_data_get(url)
+            self._refresh_shared()
+            since = self._shared_version
+            started = perf_counter()
+            response = self._get_data_get(url, params)
+            elapsed = perf_counter() - started
             reply = response.json()
             if reply:
+                things = []
                 for data in reply:
-                    thing_object = self._create_thing(thing)
-                    thing_object.load_data(data)
-                    package[thing_object.id] = thing_object
-            url = ''
+                    things.append(self._put_thing(data, package, thing))
+                self._share(things, since)
+            items = len(reply or [])
             links = response.links
-            if links:
-                if 'next' in links:
-                    url = links['next']['url']
+            has_next = bool(links) and 'next' in links
+            if params and has_next and 0 < items < params['page_size']:
+                start = (params['page'] - 1) * items
+                if items == stats.default_page_size:
+                    # application ignores page_size, follow its links
+                    sizer.ignored = True
+                else:
+                    # application cut page size down to its maximum
+                    max_size = items
+            stats.add(response, max(0, start + items - offset))
+            offset = max(offset, start + items)
+            if not has_next:
+                break
+            page_size = None
+            if not sizer.ignored:
+                page_size = sizer.update(
+                    items, len(response.content), elapsed, max_size
+                    )
+            if page_size is None:
+                # next page of application follows this one
+                url = links['next']['url']
+                params = None
+                start += items
+                continue
+            # page containing first thing which wasn't fetched,
+            # things fetched twice are just loaded again
+            page = offset // page_size + 1
+            start = (page - 1) * page_size
+            params = {'page': page, 'page_size': page_size}
 
     def _get_thing(self, url, package, thing):
         """get a one thing by url."""
         response = self._get_data_get(url)
         if response:
             reply = response.json()
+            return self._put_thing(reply, package, thing)
+
+    def _put_thing(self, data, package, thing):
+        """load data into thing object with the same id or into new one."""
+        thing_object = package.get(int(data['id']))
+        if thing_object is None:
             thing_object = self._create_thing(thing)
-            thing_object.load_data(reply)
-            package[thing_object.id] = thing_object
-            return thing_object
+        thing_object.load_data(data)
+        package[thing_object.id] = thing_object
+        return thing_object
+
+    def _thing_by_id(self, thing_id, package, thing, section):
+        """
+        get thing from package, shared cache or application.
+
+        Things changed by other processes are reloaded.
+        """
+        key = f'{thing}:{thing_id}'
+        self._refresh_shared()
+        if thing_id in package and key not in self._stale:
+            return package[thing_id]
+        self._stale.discard(key)
+        data = None
+        if self._shared is not None:
+            data = self._shared.get(key)
+        if data is not None:
+            self._put_thing(data, package, thing)
+        else:
+            since = self._shared_version
+            url = f"{BASE_URL}{URLS[section]}{thing_id}/"
+            thing_object = self._get_thing(url, package, thing)
+            if thing_object is not None:
+                self._share([thing_object], since)
+        return package[thing_id]
 
     def _get_page_things(self, url, package, thing):
         """get a list of Thing (friend, belonging) and a links."""
+        from transfer import TransferStats
         response = self._get_data_get(url)
         reply = response.json()
+        stats = self.transfer_stats.setdefault(thing, TransferStats())
+        stats.add(response, len(reply or []))
         if reply:
             things = []
             for data in reply:
-                thing_object = self._create_thing(thing)
-                thing_object.load_data(data)
-                if not thing_object.id in package:
-                    package[thing_object.id] = thing_object
-                things.append(thing_object)
+                things.append(self._put_thing(data, package, thing))
             return things, response.links
 
     # working with friends
@@ -288,6 +431,7 @@ class User:
         friend.id = data['id']
         friend.overdue = bool(data['has_overdue'])
         friend._name = data['name']
+        self._index_thing(friend)
 
     def get_friends(self):
         """get a friends list."""
@@ -296,9 +440,7 @@ class User:
         reply = response.json()
         if reply:
             for data in reply:
-                friend = Friend(self)
-                friend.load_data(data)
-                self._friends[friend.id] = friend
+                self._put_thing(data, self._friends, 'friend')
 
     def get_all_friends(self):
         """get a all friends list from application database."""
@@ -336,10 +478,9 @@ class User:
 
     def friend_by_id(self, friend_id):
         """get friend from list by friend_id."""
-        if not friend_id in self._friends:
-            url = f"{BASE_URL}{URLS['friends']}{friend_id}/"
-            self._get_thing(url, self._friends, 'friend')
-        return self._friends[friend_id]
+        return self._thing_by_id(
+            friend_id, self._friends, 'friend', 'friends'
+            )
 
     # working with belongings
     def _load_belonging_data(self, belonging, data):
@@ -348,6 +489,7 @@ class User:
         belonging._name = data['name']
         if 'is_borrowed' in data:
             belonging.borrowed = data['is_borrowed']
+        self._index_thing(belonging)
 
     def get_belongings(self):
         """get a belongings list."""
@@ -355,9 +497,7 @@ class User:
         reply = self._get_data_get(url)
         if reply:
             for data in reply:
-                belonging = Belonging(self)
-                belonging.load_data(data)
-                self._belongings[belonging.id] = belonging
+                self._put_thing(data, self._belongings, 'belonging')
 
     def get_all_belongings(self):
         """get a belongings list."""
@@ -381,10 +521,9 @@ class User:
 
     def belonging_by_id(self, belonging_id):
         """get belonging from list by belonging_id."""
-        if not belonging_id in self._belongings:
-            url = f"{BASE_URL}{URLS['belongings']}{belonging_id}/"
-            self._get_thing(url, self._belongings, 'belonging')
-        return self._belongings[belonging_id]
+        return self._thing_by_id(
+            belonging_id, self._belongings, 'belonging', 'belongings'
+            )
 
     def add_belonging(self, belonging):
         """add new belonging."""
@@ -410,6 +549,8 @@ class User:
         borrow.what = belonging
         borrow.who = friend
         borrow.returned = data['returned']
+        self._note_activity(borrow)
+        self._add_to_timeline(borrow)
 
     def get_borrowings(self):
         """get a borrowings list."""
@@ -418,16 +559,18 @@ class User:
         reply = response.json()
         if reply:
             for data in reply:
-                borrow = Borrow(self)
-                borrow.load_data(data)
-                self._borrowings[borrow.id] = borrow
+                self._put_thing(data, self._borrowings, 'borrowing')
+
+    def get_all_borrowings(self):
+        """get a all borrowings list from application database."""
+        url = BASE_URL + URLS['borrowings']
+        self._get_all_things(url, self._borrowings, 'borrowing')
 
     def borrow_by_id(self, borrow_id):
         """get borrow by id from self package borrows."""
-        if not borrow_id in self._borrowings:
-            url = f"{BASE_URL}{URLS['borrowings']}{borrow_id}/"
-            self._get_thing(url, self._borrowings, 'borrowing')
-        return self._borrowings[borrow_id]
+        return self._thing_by_id(
+            borrow_id, self._borrowings, 'borrowing', 'borrowings'
+            )
 
     def borrow_to(self, friend, belonging, when=None):
         """
@@ -445,11 +588,18 @@ class User:
             data['when'] = local_datetime_string(when)
         else:
             data['when'] = local_datetime_string(dt.now())
+        if self._write_behind is not None:
+            with self._lock:
+                things = {
+                    'friend': self._dump_friend_data(friend),
+                    'belonging': self._dump_belonging_data(belonging),
+                    }
+                entry = self._write_behind.append('borrow', data, things)
+                return self._apply_entry(entry)
         reply = self._get_data_post(url, data)
         if reply:
-            borrow = Borrow(self)
-            borrow.load_data(reply)
-            self._borrowings[borrow.id] = borrow
+            borrow = self._put_thing(reply, self._borrowings, 'borrowing')
+            self._share_written(borrow)
             return borrow
 
     def get_missing(self):
@@ -465,9 +615,9 @@ class User:
         if reply:
             borrowings = []
             for data in reply:
-                borrow = Borrow(self)
-                borrow.load_data(data)
-                borrowings.append(borrow)
+                borrowings.append(
+                    self._put_thing(data, self._borrowings, 'borrowing')
+                    )
             return borrowings
 
     def get_overdue(self):
@@ -483,9 +633,9 @@ class User:
         if reply:
             borrowings = []
             for data in reply:
-                borrow = Borrow(self)
-                borrow.load_data(data)
-                borrowings.append(borrow)
+                borrowings.append(
+                    self._put_thing(data, self._borrowings, 'borrowing')
+                    )
             return borrowings
 
     def friend_borrowings(self, friend):
@@ -496,9 +646,9 @@ class User:
         if reply:
             borrowings = []
             for data in reply:
-                borrow = Borrow(self)
-                borrow.load_data(data)
-                borrowings.append(borrow)
+                borrowings.append(
+                    self._put_thing(data, self._borrowings, 'borrowing')
+                    )
             return borrowings
 
     def borrow_return(self, borrow, when=None):
@@ -507,30 +657,553 @@ class User:
 
         borrow : Borrow object.
         when : datetime object, if None than returned now.
+        return borrow reloaded from application or None if it failed.
         """
         if when is None:
             returned = local_datetime_string(dt.now())
         else:
             returned = local_datetime_string(when)
+        if self._write_behind is not None:
+            with self._lock:
+                data = {'id': borrow.id, 'returned': returned}
+                borrow_key = None
+                if not borrow.id:
+                    borrow_key = data['borrow_key'] = self._pending_key(borrow)
+                things = {
+                    'friend': self._dump_friend_data(borrow.who),
+                    'belonging': self._dump_belonging_data(borrow.what),
+                    'borrow': self._dump_borrow_data(borrow),
+                    }
+                entry = self._write_behind.append(
+                    'return', data, things, borrow_key
+                    )
+                return self._apply_entry(entry)
         url = f"{BASE_URL}{URLS['borrowings']}{borrow.id}/"
         data = {'returned': returned}
         reply = self._get_data_patch(url, data)
         if reply:
-            borrow.returned = when
+            borrow.load_data(reply)
+            self._share_written(borrow)
+            return borrow
+
+    # working with session
+    def session(self, max_workers=8):
+        """
+        unit of work: changes of things made inside 'with' block are
+        pushed to application when the block ends.
+
+        with user.session() as session:
+            friend.name = 'James Barnes'
+            borrow.returned = dt.now()
+        """
+        from session import Session
+        return Session(self, max_workers)
+
+    @contextmanager
+    def _untracked(self):
+        """changes made inside aren't noted by session (loading data)."""
+        self._local.untracked = getattr(self._local, 'untracked', 0) + 1
+        try:
+            yield
+        finally:
+            self._local.untracked -= 1
+
+    def _track(self, thing, field, old_value):
+        """note change of thing's field for session."""
+        if self._session is not None \
+                and not getattr(self._local, 'untracked', 0):
+            self._session.track(thing, field, old_value)
+
+    def _patch_thing(self, thing, fields):
+        """push changed fields of thing to application, return reply."""
+        if isinstance(thing, Friend):
+            data = self._dump_friend_data(thing)
+            url = f"{BASE_URL}{URLS['friends']}{thing.id}/"
+        elif isinstance(thing, Belonging):
+            data = self._dump_belonging_data(thing)
+            url = f"{BASE_URL}{URLS['belongings']}{thing.id}/"
+        else:
+            data = self._dump_borrow_data(thing)
+            url = f"{BASE_URL}{URLS['borrowings']}{thing.id}/"
+        payload = {FIELDS[field]: data[FIELDS[field]] for field in fields}
+        return self._get_data_patch(url, payload)
+
+    # working with write-behind journal
+    def write_behind(self, path, batch_size=20, interval=1.0):
+        """
+        turn on write-behind mode: borrow_to and borrow_return only write
+        changes into local journal and update objects, journal is pushed
+        to application by background thread.
+
+        path : str path to journal file, not pushed changes are replayed
+        without application.
+        batch_size : quantity of changes pushed at once.
+        interval : seconds between pushes.
+        """
+        from journal import WriteBehind
+        self._write_behind = WriteBehind(
+            path, self._send_entry, self._undo_entry, batch_size, interval
+            )
+        for entry in self._write_behind.journal.pending():
+            self._apply_entry(entry)
+        self._write_behind.start()
+
+    def flush(self):
+        """push journal now, return True if all changes were pushed."""
+        if self._write_behind is not None:
+            return self._write_behind.flush()
+        return True
+
+    def close(self):
+        """turn off write-behind mode pushing the rest of journal."""
+        if self._write_behind is not None:
+            pushed = self._write_behind.close()
+            self._write_behind = None
+            return pushed
+        return True
+
+    def rejected_changes(self):
+        """
+        get changes which application rejected, their effect is undone:
+        list of dicts with journal 'entry' and 'reason'.
+        """
+        if self._write_behind is not None:
+            return self._write_behind.journal.rejected()
+        return []
+
+    def forget_rejected_changes(self):
+        if self._write_behind is not None:
+            self._write_behind.journal.forget_rejected()
+
+    def _pending_key(self, borrow):
+        """get journal key of borrow which wasn't pushed yet."""
+        for key, pending_borrow in self._pending_borrowings.items():
+            if pending_borrow is borrow:
+                return key
+        raise KeyError('borrow has no id and is not in journal')
+
+    def _restore_thing(self, data, package, thing):
+        """get thing from package or make it from journaled data."""
+        if data['id'] in package:
+            return package[data['id']]
+        return self._put_thing(data, package, thing)
+
+    def _journaled_borrow(self, entry):
+        """get borrow which journal entry of return refers to."""
+        data = entry['data']
+        things = entry['things']
+        self._restore_thing(things['friend'], self._friends, 'friend')
+        self._restore_thing(things['belonging'], self._belongings, 'belonging')
+        borrow_key = data.get('borrow_key')
+        if borrow_key in self._pending_borrowings:
+            return self._pending_borrowings[borrow_key]
+        borrow_data = dict(things['borrow'])
+        if not borrow_data['id']:
+            # borrow was pushed before restart
+            borrow_data['id'] = self._write_behind.journal.done_id(borrow_key)
+        return self._restore_thing(borrow_data, self._borrowings, 'borrowing')
+
+    def _apply_entry(self, entry):
+        """apply journal entry to objects in memory."""
+        with self._lock, self._untracked():
+            data = entry['data']
+            things = entry['things']
+            if entry['operation'] == 'borrow':
+                borrow = Borrow(self)
+                borrow.when = dt.fromisoformat(data['when'])
+                borrow.what = self._restore_thing(
+                    things['belonging'], self._belongings, 'belonging'
+                    )
+                borrow.who = self._restore_thing(
+                    things['friend'], self._friends, 'friend'
+                    )
+                borrow.what.borrowed = True
+                self._pending_borrowings[entry['key']] = borrow
+                self._note_activity(borrow)
+                return borrow
+            if entry['operation'] == 'return':
+                borrow = self._journaled_borrow(entry)
+                borrow.returned = dt.fromisoformat(data['returned'])
+                borrow.what.borrowed = False
+                self._note_activity(borrow)
+                self._add_to_timeline(borrow)
+                return borrow
+
+    def _undo_entry(self, entry):
+        """undo effect of journal entry which application rejected."""
+        with self._lock, self._untracked():
+            things = entry['things']
+            if entry['operation'] == 'borrow':
+                borrow = self._pending_borrowings.pop(entry['key'], None)
+                if borrow is not None:
+                    borrow.what.load_data(things['belonging'])
+            elif entry['operation'] == 'return':
+                borrow = self._journaled_borrow(entry)
+                returned = things['borrow']['returned']
+                borrow._returned = returned and convert_datetime(returned)
+                borrow.what.load_data(things['belonging'])
+                self._add_to_timeline(borrow)
+
+    def _send_entry(self, entry):
+        """
+        push journal entry to application, return id or None if it should
+        be pushed again, raise Rejected if application rejected it.
+        """
+        from journal import Rejected
+        data = dict(entry['data'])
+        headers = {'Idempotency-Key': entry['key']}
+        if entry['operation'] == 'borrow':
+            url = BASE_URL + URLS['borrowings']
+            reply = self._get_data_post(url, data, headers, True)
+            if reply:
+                borrow_id = int(reply['id'])
+                try:
+                    self._load_pushed_borrow(entry['key'], reply)
+                except Exception as err:
+                    # borrow is pushed, it mustn't be pushed again
+                    print(f'Unexpected error occurred {err}')
+                return borrow_id
+        elif entry['operation'] == 'return':
+            borrow_id = data.pop('id')
+            borrow_key = data.pop('borrow_key', None)
+            if not borrow_id:
+                borrow_id = self._write_behind.journal.done_id(borrow_key)
+            if not borrow_id:
+                raise Rejected('borrow of return was not pushed')
+            url = f"{BASE_URL}{URLS['borrowings']}{borrow_id}/"
+            reply = self._get_data_patch(url, data, headers, True)
+            if reply:
+                with self._lock:
+                    borrow = self._borrowings.get(borrow_id)
+                try:
+                    if borrow is not None:
+                        self._share_written(borrow)
+                except Exception as err:
+                    print(f'Unexpected error occurred {err}')
+                return borrow_id
+
+    def _load_pushed_borrow(self, key, reply):
+        """load reply of application into borrow of journal entry."""
+        with self._lock:
+            borrow = self._pending_borrowings.get(key)
+            if borrow is None:
+                borrow = Borrow(self)
+            try:
+                borrow.load_data(reply)
+            finally:
+                # id is set before borrow stops being pending
+                borrow.id = int(reply['id'])
+                self._borrowings[borrow.id] = borrow
+                self._pending_borrowings.pop(key, None)
+        self._share_written(borrow)
+
+    # working with search by name
+    def _index_thing(self, thing):
+        """add friend or belonging into index of names."""
+        if not thing.id:
+            return
+        with self._lock:
+            if isinstance(thing, Friend):
+                self._name_index.add(('friend', thing.id), thing.name)
+            elif isinstance(thing, Belonging):
+                self._name_index.add(('belonging', thing.id), thing.name)
+
+    def _note_activity(self, borrow):
+        """note borrowing activity of friend and belonging of borrow."""
+        moments = [moment for moment in (borrow.when, borrow.returned)
+                   if moment is not None]
+        if not moments:
+            return
+        timestamp = max(moment.timestamp() for moment in moments)
+        with self._lock:
+            if borrow.who is not None:
+                self._name_index.touch(('friend', borrow.who.id), timestamp)
+            if borrow.what is not None:
+                self._name_index.touch(
+                    ('belonging', borrow.what.id), timestamp
+                    )
+
+    def search(self, query, thing=None, limit=10):
+        """
+        find friends and belongings by name prefix or similar name.
+
+        query : str part of name.
+        thing : str 'friend' or 'belonging', if None - both of them.
+        limit : int maximum quantity of found things.
+        Things which were borrowed recently come first.
+        """
+        def accept(key):
+            return thing is None or key[0] == thing
+
+        with self._lock:
+            keys = self._name_index.search(query, limit, accept)
+        found = []
+        for kind, thing_id in keys:
+            if kind == 'friend':
+                found.append(self.friend_by_id(thing_id))
+            else:
+                found.append(self.belonging_by_id(thing_id))
+        return found
+
+    # working with timeline of borrowings
+    def _timeline(self, friend=None, belonging=None):
+        """
+        get timeline of borrowings: all of them, of friend or of belonging.
+
+        Timelines are built from loaded borrowings on the first call and
+        are kept up to date after. Timeline isn't thread-safe, even its
+        queries change it, so it is queried under the lock only.
+        """
+        from timeline import Timeline
+        with self._lock:
+            if self._timelines is None:
+                self._build_timelines()
+            if friend is not None:
+                key = ('friend', friend.id)
+            elif belonging is not None:
+                key = ('belonging', belonging.id)
+            else:
+                key = None
+            return self._timelines.setdefault(key, Timeline())
+
+    def _timeline_keys_of(self, borrow):
+        return {None, ('friend', borrow.who.id),
+                ('belonging', borrow.what.id)}
+
+    def _build_timelines(self):
+        """build timelines of loaded borrowings at once."""
+        from timeline import Timeline, timestamp
+        borrowings = {}
+        for borrow in self._borrowings.values():
+            if not borrow.id or borrow.when is None:
+                continue
+            keys = self._timeline_keys[borrow.id] = \
+                self._timeline_keys_of(borrow)
+            # moments are converted once for all timelines of borrow
+            returned = borrow.returned
+            interval = (borrow.id, timestamp(borrow.when),
+                        None if returned is None else timestamp(returned))
+            for key in keys:
+                borrowings.setdefault(key, []).append(interval)
+        self._timelines = {}
+        for key, key_borrowings in borrowings.items():
+            self._timelines[key] = Timeline()
+            self._timelines[key].add_many(key_borrowings)
+
+    def _add_to_timeline(self, borrow):
+        """add borrow into timelines or change it there."""
+        if self._timelines is None or not borrow.id or borrow.when is None:
+            return
+        from timeline import Timeline
+        keys = self._timeline_keys_of(borrow)
+        with self._lock:
+            for key in self._timeline_keys.get(borrow.id, set()) - keys:
+                self._timelines[key].discard(borrow.id)
+            for key in keys:
+                timeline = self._timelines.setdefault(key, Timeline())
+                timeline.add(borrow.id, borrow.when, borrow.returned)
+            self._timeline_keys[borrow.id] = keys
+
+    # borrowings made in write-behind mode get into timelines
+    # when they are pushed to application and get their id
+    def _query_timeline(self, query, friend, belonging, *args):
+        """result of query of timeline, made under the lock."""
+        with self._lock:
+            return getattr(self._timeline(friend, belonging), query)(*args)
+
+    def lent_at(self, moment, friend=None, belonging=None):
+        """get borrowings lent at moment (datetime)."""
+        borrow_ids = self._query_timeline('at', friend, belonging, moment)
+        return [self.borrow_by_id(borrow_id) for borrow_id in borrow_ids]
+
+    def lent_between(self, start, end, friend=None, belonging=None):
+        """get borrowings lent at any moment from start till end."""
+        borrow_ids = self._query_timeline(
+            'overlapping', friend, belonging, start, end
+            )
+        return [self.borrow_by_id(borrow_id) for borrow_id in borrow_ids]
+
+    def lent_on_day(self, day, friend=None, belonging=None):
+        """get borrowings lent at any moment of day (date)."""
+        borrow_ids = self._query_timeline('on_day', friend, belonging, day)
+        return [self.borrow_by_id(borrow_id) for borrow_id in borrow_ids]
+
+    def lent_count(self, moment, friend=None, belonging=None):
+        """get quantity of borrowings lent at moment (datetime)."""
+        return self._query_timeline('count_at', friend, belonging, moment)
+
+    def max_lent(self, start, end, friend=None, belonging=None):
+        """get maximum quantity of borrowings lent at once
+        from start till end."""
+        return self._query_timeline(
+            'max_concurrent', friend, belonging, start, end
+            )
+
+    # working with cache shared by processes
+    def use_shared_cache(self, path, refresh_interval=SHARED_REFRESH):
+        """
+        share things with other processes of this host.
+
+        path : str path to cache file, one file for one account.
+        refresh_interval : seconds while things changed by other processes
+        aren't looked for.
+        """
+        from sharedcache import SharedCache
+        self._shared = SharedCache(path)
+        self._shared_version = self._shared.version()
+        self._shared_interval = refresh_interval
+        self._shared_checked = perf_counter()
+
+    def _shared_key(self, thing):
+        if isinstance(thing, Friend):
+            return f'friend:{thing.id}'
+        if isinstance(thing, Belonging):
+            return f'belonging:{thing.id}'
+        return f'borrowing:{thing.id}'
+
+    def _dump_thing_data(self, thing):
+        if isinstance(thing, Friend):
+            return self._dump_friend_data(thing)
+        if isinstance(thing, Belonging):
+            return self._dump_belonging_data(thing)
+        return self._dump_borrow_data(thing)
+
+    def _refresh_shared(self):
+        """note things which were changed by any process."""
+        if self._shared is None:
+            return
+        now = perf_counter()
+        if now - self._shared_checked < self._shared_interval:
+            return
+        self._shared_checked = now
+        if not self._shared.changed():
+            return
+        version, keys = self._shared.changes(self._shared_version)
+        packages = {
+            'friend': self._friends,
+            'belonging': self._belongings,
+            'borrowing': self._borrowings,
+            }
+        if keys is None:
+            keys = [f'{thing}:{thing_id}'
+                    for thing, package in packages.items()
+                    for thing_id in package]
+        for key in keys:
+            # things which aren't loaded will be fetched anyway
+            thing, thing_id = key.split(':')
+            if int(thing_id) in packages[thing]:
+                self._stale.add(key)
+        self._shared_version = version
+
+    def _share(self, things, since):
+        """put things fetched at version 'since' into shared cache."""
+        if self._shared is not None and things:
+            self._shared.set_many(
+                [(self._shared_key(thing), self._dump_thing_data(thing))
+                 for thing in things],
+                since,
+                )
+
+    def _share_written(self, thing):
+        """
+        drop thing written to application from caches of all processes,
+        and put its new data. Friend and belonging of borrow are dropped
+        too: application changes their overdue and borrowed state.
+        """
+        if self._shared is None:
+            return
+        keys = [self._shared_key(thing)]
+        if isinstance(thing, Borrow):
+            keys += [self._shared_key(thing.who), self._shared_key(thing.what)]
+        version = self._shared.invalidate(keys)
+        self._shared.set(keys[0], self._dump_thing_data(thing), version)
+
+    # working with local cache
+    def _dump_friend_data(self, friend):
+        """dump friend object into data as application does."""
+        return {
+            'id': friend.id,
+            'name': friend.name,
+            'has_overdue': friend.overdue,
+            }
+
+    def _dump_belonging_data(self, belonging):
+        """dump belonging object into data as application does."""
+        return {
+            'id': belonging.id,
+            'name': belonging.name,
+            'is_borrowed': belonging.borrowed,
+            }
+
+    def _dump_borrow_data(self, borrow):
+        """dump borrow object into data as application does."""
+        data = {
+            'id': borrow.id,
+            'what': borrow.what.id,
+            'to_who': borrow.who.id,
+            'when': utc_datetime_string(borrow.when),
+            'returned': None,
+            }
+        if borrow.returned:
+            data['returned'] = utc_datetime_string(borrow.returned)
+        return data
+
+    def dump_cache(self):
+        """dump all loaded things into dict for local cache."""
+        return {
+            'username': self._username,
+            'friends': [self._dump_friend_data(friend)
+                        for friend in self._friends.values()],
+            'belongings': [self._dump_belonging_data(belonging)
+                           for belonging in self._belongings.values()],
+            'borrowings': [self._dump_borrow_data(borrow)
+                           for borrow in self._borrowings.values()],
+            }
+
+    def load_cache(self, cache, *sections):
+        """
+        load things from local cache instead of application database.
+
+        cache : dict made by dump_cache.
+        sections : str names of sections (friends, belongings, borrowings),
+        if omitted - all of them. Borrowings need friends and belongings,
+        so they are loaded too.
+        """
+        if not sections or 'borrowings' in sections:
+            sections = tuple(URLS)
+        packages = {
+            'friends': (self._friends, 'friend'),
+            'belongings': (self._belongings, 'belonging'),
+            'borrowings': (self._borrowings, 'borrowing'),
+            }
+        for section in URLS:
+            if section in sections:
+                package, thing = packages[section]
+                for data in cache.get(section, []):
+                    self._put_thing(data, package, thing)
+        if not self._username:
+            self._username = cache.get('username', '')
 
     # working with API
-    def _get_data_post(self, url, data=None):
+    # requests is imported inside methods: cached queries don't need it
+    def _get_data_post(self, url, data=None, headers=None,
+                       raise_rejected=False):
+        import requests
+        from requests.exceptions import HTTPError
         try:
             if self._token:
                 auth_header = {'Authorization': f'Token {self._token}'}
+                if headers:
+                    auth_header.update(headers)
                 if data:
                     response = requests.post(url, data=data, headers=auth_header)
                 else:
                     response = requests.post(url, headers=auth_header)
             else:
-                response = requests.post(url, data=data)
+                response = requests.post(url, data=data, headers=headers)
             response.raise_for_status()
         except HTTPError as http_err:
+            self._raise_rejected(http_err, raise_rejected)
             print(f'HTTP error occurred {http_err}')
         except Exception as err:
             print(f'Unexpected error occurred {err}')
@@ -538,22 +1211,38 @@ class User:
             if response.status_code != 204:
                 return response.json()
 
-    def _get_data_patch(self, url, data):
+    def _get_data_patch(self, url, data, headers=None,
+                        raise_rejected=False):
+        import requests
+        from requests.exceptions import HTTPError
         try:
             if self._token:
                 auth_header = {'Authorization': f'Token {self._token}'}
+                if headers:
+                    auth_header.update(headers)
                 response = requests.patch(url, data=data, headers=auth_header)
             else:
-                response = requests.patch(url, data=data)
+                response = requests.patch(url, data=data, headers=headers)
             response.raise_for_status()
         except HTTPError as http_err:
+            self._raise_rejected(http_err, raise_rejected)
             print(f'HTTP error occurred {http_err}')
         except Exception as err:
             print(f'Unexpected error occurred {err}')
         else:
             return response.json()
 
+    @staticmethod
+    def _raise_rejected(http_err, raise_rejected):
+        """raise Rejected if application rejected change for good."""
+        if raise_rejected:
+            from journal import Rejected, is_rejection
+            if is_rejection(http_err.response):
+                raise Rejected(str(http_err)) from http_err
+
     def _get_data_get(self, url, param=None):
+        import requests
+        from requests.exceptions import HTTPError
         if self._token:
             auth_header = {'Authorization': f'Token {self._token}'}
             try:
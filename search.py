@@ -0,0 +1,180 @@
+"""
+search of things by name.
+
+Things are found by beginning of name or of any its word. Short prefixes
+keep their things already ranked, longer ones are looked up by their
+first characters; fuzzy search uses index of trigrams. Results are ranked
+by kind of match, then by recent borrowing activity of thing.
+"""
+
+import heapq
+from bisect import bisect_left, insort
+from collections import Counter
+
+# queries of this length and shorter are answered from ranked lists
+SHORT_PREFIX = 2
+
+
+def normalize(name):
+    return ' '.join(name.casefold().split())
+
+
+def trigrams(text):
+    # one space ahead: trigram of single letter would match too many names
+    padded = f' {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameIndex:
+    """
+    index of names of things.
+
+    key : any hashable and comparable key of thing, for example
+    ('friend', 1). Structures are updated on every change of name or
+    activity, so search never waits for them.
+    """
+
+    def __init__(self):
+        self._names = {}
+        self._activity = {}
+        # prefix of SHORT_PREFIX + 1 characters -> {(words, key)}
+        self._prefixes = {}
+        # short prefix -> sorted list of (match, -activity, name, key)
+        self._ranked = {}
+        # key -> {short prefix: its item in ranked list}
+        self._ranked_items = {}
+        self._trigrams = {}
+
+    def __len__(self):
+        return len(self._names)
+
+    def _words(self, name):
+        """name and its tails starting from every word."""
+        words = name.split(' ')
+        return [' '.join(words[i:]) for i in range(len(words))]
+
+    def _short_matches(self, name):
+        """short prefixes of name with the best kind of match."""
+        matches = {}
+        for words in self._words(name):
+            # name starting with query is better than its word
+            match = 0 if words == name else 1
+            for length in range(1, SHORT_PREFIX + 1):
+                prefix = words[:length]
+                if matches.get(prefix, 2) > match:
+                    matches[prefix] = match
+        return matches
+
+    def _rank_short(self, key):
+        name = self._names[key]
+        activity = -self._activity.get(key, float('-inf'))
+        items = {}
+        for prefix, match in self._short_matches(name).items():
+            item = (match, activity, name, key)
+            insort(self._ranked.setdefault(prefix, []), item)
+            items[prefix] = item
+        self._ranked_items[key] = items
+
+    def _unrank_short(self, key):
+        for prefix, item in self._ranked_items.pop(key, {}).items():
+            ranked = self._ranked[prefix]
+            del ranked[bisect_left(ranked, item)]
+
+    @staticmethod
+    def _put(index, index_key, value):
+        values = index.get(index_key)
+        if values is None:
+            index[index_key] = {value}
+        else:
+            values.add(value)
+
+    def _insert(self, key, name):
+        for words in self._words(name):
+            self._put(self._prefixes, words[:SHORT_PREFIX + 1], (words, key))
+        for trigram in trigrams(name):
+            self._put(self._trigrams, trigram, key)
+        self._rank_short(key)
+
+    def _remove(self, key, name):
+        for words in self._words(name):
+            self._prefixes[words[:SHORT_PREFIX + 1]].discard((words, key))
+        for trigram in trigrams(name):
+            self._trigrams[trigram].discard(key)
+        self._unrank_short(key)
+
+    def add(self, key, name):
+        """add or rename thing."""
+        name = normalize(name)
+        old_name = self._names.get(key)
+        if old_name == name:
+            return
+        if old_name is not None:
+            self._remove(key, old_name)
+        self._names[key] = name
+        self._insert(key, name)
+
+    def discard(self, key):
+        name = self._names.pop(key, None)
+        if name is not None:
+            self._remove(key, name)
+        self._activity.pop(key, None)
+
+    def touch(self, key, timestamp):
+        """note borrowing activity of thing at timestamp."""
+        if timestamp > self._activity.get(key, float('-inf')):
+            self._activity[key] = timestamp
+            if key in self._names:
+                self._unrank_short(key)
+                self._rank_short(key)
+
+    def _rank(self, match, key):
+        return (match, -self._activity.get(key, float('-inf')),
+                self._names[key])
+
+    def search(self, query, limit=10, accept=None):
+        """
+        get keys of things matching query, the best first.
+
+        accept : function(key), filter of keys.
+        Short queries are matched by prefix only.
+        """
+        query = normalize(query)
+        if not query:
+            return []
+        if len(query) <= SHORT_PREFIX:
+            return self._search_short(query, limit, accept)
+        found = {}
+        candidates = self._prefixes.get(query[:SHORT_PREFIX + 1], ())
+        for words, key in candidates:
+            if words.startswith(query) and (accept is None or accept(key)):
+                match = 0 if words == self._names[key] else 1
+                if found.get(key, 2) > match:
+                    found[key] = match
+        if len(found) < limit:
+            self._fuzzy(query, found, accept)
+        return heapq.nsmallest(
+            limit, found, key=lambda key: self._rank(found[key], key)
+            )
+
+    def _search_short(self, query, limit, accept):
+        found = []
+        for _, _, _, key in self._ranked.get(query, ()):
+            if accept is None or accept(key):
+                found.append(key)
+                if len(found) == limit:
+                    break
+        return found
+
+    def _fuzzy(self, query, found, accept):
+        """add keys of names sharing most trigrams with query."""
+        query_trigrams = trigrams(query)
+        shared = Counter()
+        for trigram in query_trigrams:
+            shared.update(self._trigrams.get(trigram, ()))
+        # at least half of trigrams of query
+        enough = max(1, len(query_trigrams) // 2)
+        for key, number in shared.items():
+            if number >= enough and key not in found \
+                    and (accept is None or accept(key)):
+                # 2 and more, the more trigrams shared the better
+                found[key] = 2 + 1 - number / len(query_trigrams)
@@ -0,0 +1,77 @@
+"""
+unit of work for user's things.
+
+Session notes which fields of which things were changed, several changes
+of one thing are merged. On commit every changed thing is pushed by one
+PATCH with changed fields only, requests are made concurrently, then
+things are reloaded from replies of application.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Session:
+    """unit of work, made by User.session()."""
+
+    def __init__(self, user, max_workers=8):
+        self._user = user
+        self._max_workers = max_workers
+        # thing -> {field: value before session}
+        self._changes = {}
+        self.failed = []
+
+    def __enter__(self):
+        if self._user._session is not None:
+            raise RuntimeError('session is already open')
+        self._user._session = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._user._session = None
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+    def track(self, thing, field, old_value):
+        """note change of field, first value is kept."""
+        self._changes.setdefault(thing, {}).setdefault(field, old_value)
+
+    def dirty(self):
+        """get changed things with their changed fields."""
+        dirty = {}
+        for thing, fields in self._changes.items():
+            changed = [field for field, old_value in fields.items()
+                       if getattr(thing, field) != old_value]
+            if changed:
+                dirty[thing] = changed
+        return dirty
+
+    def commit(self):
+        """push changes to application, return True if all were pushed."""
+        dirty = self.dirty()
+        self._changes = {}
+        self.failed = [thing for thing in dirty if not thing.id]
+        with ThreadPoolExecutor(self._max_workers) as pool:
+            futures = {
+                thing: pool.submit(self._user._patch_thing, thing, fields)
+                for thing, fields in dirty.items() if thing.id
+                }
+        for thing, future in futures.items():
+            reply = future.result()
+            if reply:
+                thing.load_data(reply)
+                self._user._share_written(thing)
+            else:
+                self.failed.append(thing)
+        return not self.failed
+
+    def rollback(self):
+        """return values which things had before session."""
+        for thing, fields in self._changes.items():
+            for field, old_value in fields.items():
+                setattr(thing, f'_{field}', old_value)
+            if 'name' in fields:
+                self._user._index_thing(thing)
+        self._changes = {}
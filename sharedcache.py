@@ -0,0 +1,138 @@
+"""
+cache of things shared by processes of one host.
+
+Cache is a sqlite file (one file for one account), so it needs neither
+server nor daemon. Every write of thing is logged as change with growing
+version; processes read changes since version they saw and reload only
+changed things. Data fetched before a change can't overwrite it.
+"""
+
+import json
+import sqlite3
+import threading
+
+# changes kept in log, processes which are behind reload everything
+CHANGES_KEPT = 10000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS things (
+    key TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS changes (
+    version INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS changes_key ON changes (key, version);
+"""
+
+
+class SharedCache:
+    """
+    host-local cache of things data by keys like 'friend:1'.
+
+    path : str path to cache file.
+    """
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, timeout=10, check_same_thread=False,
+            isolation_level=None,
+            )
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.executescript(SCHEMA)
+        self._data_version = None
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def _query(self, sql, parameters=()):
+        with self._lock:
+            return self._connection.execute(sql, parameters).fetchall()
+
+    def changed(self):
+        """
+        check if other connections wrote into cache since the last check,
+        it is cheaper than to look for changes.
+        """
+        (data_version,), = self._query('PRAGMA data_version')
+        changed = data_version != self._data_version
+        self._data_version = data_version
+        return changed
+
+    def version(self):
+        """get version of the last change."""
+        (version,), = self._query('SELECT MAX(version) FROM changes')
+        return version or 0
+
+    def get(self, key):
+        """get data of thing or None."""
+        rows = self._query('SELECT data FROM things WHERE key = ?', (key,))
+        if rows:
+            return json.loads(rows[0][0])
+
+    def set_many(self, items, since):
+        """
+        store data of things fetched when version 'since' was the last.
+
+        items : pairs of key and data.
+        Things changed after 'since' are skipped, their data is stale.
+        """
+        with self._lock, self._connection:
+            self._connection.execute('BEGIN IMMEDIATE')
+            for key, data in items:
+                (changed,), = self._connection.execute(
+                    'SELECT MAX(version) FROM changes WHERE key = ?', (key,)
+                    ).fetchall()
+                if changed is None or changed <= since:
+                    self._connection.execute(
+                        'INSERT OR REPLACE INTO things VALUES (?, ?, ?)',
+                        (key, since, json.dumps(data)),
+                        )
+
+    def set(self, key, data, since):
+        self.set_many([(key, data)], since)
+
+    def invalidate(self, keys):
+        """drop things in every process, return version of the change."""
+        with self._lock, self._connection:
+            self._connection.execute('BEGIN IMMEDIATE')
+            for key in keys:
+                self._connection.execute(
+                    'DELETE FROM things WHERE key = ?', (key,)
+                    )
+                self._connection.execute(
+                    'INSERT INTO changes (key) VALUES (?)', (key,)
+                    )
+            (version,), = self._connection.execute(
+                'SELECT MAX(version) FROM changes'
+                ).fetchall()
+            self._connection.execute(
+                'DELETE FROM changes WHERE version <= ?',
+                (version - CHANGES_KEPT,),
+                )
+        return version
+
+    def changes(self, since):
+        """
+        get the last version and keys changed after version 'since'.
+
+        Keys are None if log doesn't reach 'since' any more,
+        then all things should be reloaded.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT version, key FROM changes WHERE version > ? '
+                'ORDER BY version', (since,)
+                ).fetchall()
+            (oldest,), = self._connection.execute(
+                'SELECT MIN(version) FROM changes'
+                ).fetchall()
+        if not rows:
+            return since, set()
+        if oldest is not None and oldest > since + 1:
+            return rows[-1][0], None
+        return rows[-1][0], {key for _, key in rows}
@@ -0,0 +1,288 @@
+"""
+read-only binary snapshot of user's things shared by processes.
+
+Snapshot file:
+    header
+    friends records, belongings records, borrowings records
+    (fixed width, sorted by id, so id is found by binary search)
+    string table (utf-8 names)
+
+Processes map the file by mmap and read records without copying them.
+New snapshot replaces old file atomically, readers pick it by refresh().
+"""
+
+import datetime
+import mmap
+import os
+import struct
+
+from datetools import local_datetime
+
+MAGIC = b'MNTL'
+VERSION = 1
+
+# magic, version, friends, belongings, borrowings, strings offset
+HEADER = struct.Struct('<4sHxxIIII')
+# id, name offset, name length, overdue / borrowed
+THING = struct.Struct('<IIIB3x')
+# id, what id, who id, when, returned (microseconds since epoch, UTC)
+BORROW = struct.Struct('<III4xqq')
+NO_DATE = -2 ** 63
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def _to_micro(some_datetime):
+    if some_datetime is None:
+        return NO_DATE
+    delta = local_datetime(some_datetime) - EPOCH
+    return delta // datetime.timedelta(microseconds=1)
+
+
+def _from_micro(micro):
+    if micro == NO_DATE:
+        return None
+    return local_datetime(EPOCH + datetime.timedelta(microseconds=micro))
+
+
+def write_snapshot(user, path):
+    """write snapshot of synced user, replace old snapshot atomically."""
+    strings = bytearray()
+
+    def thing_records(package, flag):
+        records = []
+        for thing_id in sorted(package):
+            thing = package[thing_id]
+            name = thing.name.encode('utf-8')
+            records.append(THING.pack(
+                thing.id, len(strings), len(name), getattr(thing, flag)
+                ))
+            strings.extend(name)
+        return records
+
+    friends = thing_records(user._friends, 'overdue')
+    belongings = thing_records(user._belongings, 'borrowed')
+    borrowings = [
+        BORROW.pack(
+            borrow.id, borrow.what.id, borrow.who.id,
+            _to_micro(borrow.when), _to_micro(borrow.returned),
+            )
+        for _, borrow in sorted(user._borrowings.items())
+        ]
+    strings_offset = (HEADER.size
+                      + THING.size * (len(friends) + len(belongings))
+                      + BORROW.size * len(borrowings))
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as snapshot_file:
+        snapshot_file.write(HEADER.pack(
+            MAGIC, VERSION, len(friends), len(belongings), len(borrowings),
+            strings_offset,
+            ))
+        for record in friends + belongings + borrowings:
+            snapshot_file.write(record)
+        snapshot_file.write(strings)
+        snapshot_file.flush()
+        os.fsync(snapshot_file.fileno())
+    os.replace(tmp_path, path)
+
+
+class ThingView:
+    """read-only view of thing record in snapshot."""
+    __slots__ = ('_snapshot', '_offset')
+
+    def __init__(self, snapshot, offset):
+        self._snapshot = snapshot
+        self._offset = offset
+
+    def _record(self):
+        return THING.unpack_from(self._snapshot.buffer, self._offset)
+
+    @property
+    def id(self):
+        return self._record()[0]
+
+    @property
+    def name(self):
+        _, name_offset, name_length, _ = self._record()
+        start = self._snapshot.strings_offset + name_offset
+        return str(self._snapshot.buffer[start:start + name_length], 'utf-8')
+
+
+class FriendView(ThingView):
+    """read-only friend."""
+    __slots__ = ()
+
+    def __str__(self):
+        return f'Friend: {self.name}'
+
+    def __repr__(self):
+        return f'<FriendView object: Friend.name = {self.name}>'
+
+    @property
+    def overdue(self):
+        return bool(self._record()[3])
+
+
+class BelongingView(ThingView):
+    """read-only belonging."""
+    __slots__ = ()
+
+    def __str__(self):
+        return f'Belonging: {self.name}'
+
+    def __repr__(self):
+        return f'<BelongingView object: Belonging.name = {self.name}>'
+
+    @property
+    def borrowed(self):
+        return bool(self._record()[3])
+
+
+class BorrowView:
+    """read-only borrow."""
+    __slots__ = ('_snapshot', '_offset')
+
+    def __init__(self, snapshot, offset):
+        self._snapshot = snapshot
+        self._offset = offset
+
+    def _record(self):
+        return BORROW.unpack_from(self._snapshot.buffer, self._offset)
+
+    def __str__(self):
+        return f'Borrow: {self.what} to {self.who}'
+
+    def __repr__(self):
+        return f'<BorrowView object: Borrow.id = {self.id}>'
+
+    @property
+    def id(self):
+        return self._record()[0]
+
+    @property
+    def what(self):
+        return self._snapshot.belonging_by_id(self._record()[1])
+
+    @property
+    def who(self):
+        return self._snapshot.friend_by_id(self._record()[2])
+
+    @property
+    def when(self):
+        return _from_micro(self._record()[3])
+
+    @property
+    def returned(self):
+        return _from_micro(self._record()[4])
+
+
+class SnapshotData:
+    """one mapped snapshot file."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as snapshot_file:
+            stat = os.fstat(snapshot_file.fileno())
+            self.key = (stat.st_ino, stat.st_mtime_ns)
+            self.buffer = mmap.mmap(
+                snapshot_file.fileno(), 0, access=mmap.ACCESS_READ
+                )
+        (magic, version, self.number_friends, self.number_belongings,
+         self.number_borrowings, self.strings_offset,
+         ) = HEADER.unpack_from(self.buffer)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path} is not a snapshot file')
+        self.friends_offset = HEADER.size
+        self.belongings_offset = (self.friends_offset
+                                  + THING.size * self.number_friends)
+        self.borrowings_offset = (self.belongings_offset
+                                  + THING.size * self.number_belongings)
+
+    def _find(self, offset, size, number, thing_id):
+        """binary search of record by id, return record offset."""
+        low, high = 0, number
+        while low < high:
+            middle = (low + high) // 2
+            middle_id, = struct.unpack_from(
+                '<I', self.buffer, offset + middle * size
+                )
+            if middle_id < thing_id:
+                low = middle + 1
+            elif middle_id > thing_id:
+                high = middle
+            else:
+                return offset + middle * size
+        raise KeyError(thing_id)
+
+    def friend_by_id(self, friend_id):
+        return FriendView(self, self._find(
+            self.friends_offset, THING.size, self.number_friends, friend_id
+            ))
+
+    def belonging_by_id(self, belonging_id):
+        return BelongingView(self, self._find(
+            self.belongings_offset, THING.size, self.number_belongings,
+            belonging_id,
+            ))
+
+    def borrow_by_id(self, borrow_id):
+        return BorrowView(self, self._find(
+            self.borrowings_offset, BORROW.size, self.number_borrowings,
+            borrow_id,
+            ))
+
+
+class Snapshot:
+    """
+    read-only user's things from snapshot file.
+
+    Views taken before refresh() keep reading the old snapshot.
+    """
+
+    def __init__(self, path):
+        self._path = path
+        self._data = SnapshotData(path)
+
+    def refresh(self):
+        """map new snapshot file if it was replaced, return True if so."""
+        stat = os.stat(self._path)
+        if (stat.st_ino, stat.st_mtime_ns) == self._data.key:
+            return False
+        self._data = SnapshotData(self._path)
+        return True
+
+    def friend_by_id(self, friend_id):
+        return self._data.friend_by_id(friend_id)
+
+    def belonging_by_id(self, belonging_id):
+        return self._data.belonging_by_id(belonging_id)
+
+    def borrow_by_id(self, borrow_id):
+        return self._data.borrow_by_id(borrow_id)
+
+    def number_friends(self):
+        return self._data.number_friends
+
+    def number_belongings(self):
+        return self._data.number_belongings
+
+    def number_borrowings(self):
+        return self._data.number_borrowings
+
+    def friends(self):
+        data = self._data
+        for number in range(data.number_friends):
+            yield FriendView(data, data.friends_offset + number * THING.size)
+
+    def belongings(self):
+        data = self._data
+        for number in range(data.number_belongings):
+            yield BelongingView(
+                data, data.belongings_offset + number * THING.size
+                )
+
+    def borrowings(self):
+        data = self._data
+        for number in range(data.number_borrowings):
+            yield BorrowView(
+                data, data.borrowings_offset + number * BORROW.size
+                )
@@ -0,0 +1,119 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from conftest import FakeApplication
+from mintal import User
+
+STARTUP_LIMIT = 0.1
+
+CACHE = {
+    'username': 'djoser',
+    'friends': [
+        {'id': 1, 'name': 'John Doe', 'has_overdue': True},
+        {'id': 2, 'name': 'Sam Wilson', 'has_overdue': False},
+        ],
+    'belongings': [
+        {'id': 1, 'name': 'umbrella', 'is_borrowed': True},
+        {'id': 2, 'name': 'hammer', 'is_borrowed': False},
+        ],
+    'borrowings': [
+        {'id': 1, 'what': 1, 'to_who': 1,
+         'when': '2020-01-12T17:15:00.000000Z', 'returned': None},
+        ],
+    'overdue': [1],
+    }
+
+STARTUP = """
+import sys, time
+start = time.perf_counter()
+import cli
+cli.main(sys.argv[1:])
+elapsed = time.perf_counter() - start
+print('requests' in sys.modules, 'pytz' in sys.modules, elapsed)
+"""
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    path = tmp_path / 'cache.json'
+    path.write_text(json.dumps(CACHE))
+    return str(path)
+
+def run_cli(*argv):
+    result = subprocess.run(
+        [sys.executable, '-c', STARTUP, *argv],
+        capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+    lines = result.stdout.splitlines()
+    has_requests, has_pytz, elapsed = lines[-1].split()
+    return lines[:-1], has_requests == 'True', has_pytz == 'True', \
+           float(elapsed)
+
+def test_friends_list_startup(cache_path):
+    lines, has_requests, has_pytz, elapsed = run_cli(
+        '--cache', cache_path, 'friends', 'list'
+        )
+    assert lines == ['1\tJohn Doe\toverdue', '2\tSam Wilson']
+    assert not has_requests
+    assert not has_pytz
+    assert elapsed < STARTUP_LIMIT
+
+def test_overdue_from_cache(cache_path):
+    lines, has_requests, has_pytz, elapsed = run_cli(
+        '--cache', cache_path, 'overdue'
+        )
+    assert lines == ['1\tumbrella\tJohn Doe']
+    assert not has_requests
+
+def test_cache_round_trip():
+    user = User()
+    user.load_cache(CACHE)
+    assert user.number_friends() == 2
+    assert user.borrow_by_id(1).what.name == 'umbrella'
+    cache = user.dump_cache()
+    assert cache['borrowings'] == CACHE['borrowings']
+    assert cache['friends'] == CACHE['friends']
+
+def test_return_failed(cache_path, monkeypatch, capsys):
+    import cli
+    monkeypatch.setattr(User, '_get_data_patch',
+                        lambda self, url, data, headers=None: None)
+    assert cli.main(['--token', 'token', '--cache', cache_path,
+                     'return', '1']) == 1
+    assert 'not returned' in capsys.readouterr().err
+    assert json.loads(open(cache_path).read()) == CACHE
+
+def test_return_updates_cache(cache_path, monkeypatch):
+    import cli
+
+    def patch(self, url, data, headers=None):
+        return dict(CACHE['borrowings'][0],
+                    returned='2020-01-20T17:15:00.000000Z')
+    monkeypatch.setattr(User, '_get_data_patch', patch)
+    assert cli.main(['--token', 'token', '--cache', cache_path,
+                     'return', '1']) == 0
+    cache = json.loads(open(cache_path).read())
+    assert cache['overdue'] == []
+    assert not cache['belongings'][0]['is_borrowed']
+    assert not cache['friends'][0]['has_overdue']
+    lines, _, _, _ = run_cli('--cache', cache_path, 'overdue')
+    assert lines == []
+
+def test_borrow_no_cache(cache_path, monkeypatch):
+    import cli
+    application = FakeApplication(CACHE)
+    monkeypatch.setattr(User, '_get_data_get',
+                        lambda self, url, param=None: application.get(url))
+    monkeypatch.setattr(User, '_get_data_post',
+                        lambda self, url, data=None, headers=None:
+                        application.post(url, data))
+    assert cli.main(['--token', 'token', '--cache', cache_path,
+                     '--no-cache', 'borrow', '2', '2']) == 0
+    # things are asked from application, not taken from cache
+    assert [request[0] for request in application.requests] \
+           == ['get', 'get', 'post']
+    assert json.loads(open(cache_path).read()) == CACHE
@@ -0,0 +1,80 @@
+import gc
+
+import pytest
+from conftest import FakeResponse
+from identity import IdentityMap
+from mintal import Belonging, Borrow, Friend, User
+
+
+@pytest.fixture
+def get_user():
+    user = User(max_entries=3)
+    user.fetched = []
+
+    def get(url, param=None):
+        friend_id = int(url.rstrip('/').split('/')[-1])
+        user.fetched.append(friend_id)
+        return FakeResponse(
+            {'id': friend_id, 'name': f'friend {friend_id}',
+             'has_overdue': False}
+            )
+    user._get_data_get = get
+    return user
+
+def test_lru_eviction():
+    package = IdentityMap(max_entries=2)
+    user = User()
+    friends = [Friend(user, f'friend {number}') for number in range(3)]
+    for number, friend in enumerate(friends):
+        package[number] = friend
+    package[0]
+    package[2]
+    del friends
+    gc.collect()
+    assert 1 not in package
+    assert list(package) == [0, 2]
+
+def test_memory_budget():
+    user = User()
+    package = IdentityMap(max_bytes=1)
+    package[1] = Friend(user, 'John Doe')
+    package[2] = Friend(user, 'Sam Wilson')
+    gc.collect()
+    assert len(package) == 1
+
+def test_refetch_evicted(get_user):
+    user = get_user
+    for friend_id in range(1, 6):
+        user.friend_by_id(friend_id)
+    gc.collect()
+    assert user.number_friends() == 3
+    assert user.friend_by_id(1).name == 'friend 1'
+    assert user.fetched == [1, 2, 3, 4, 5, 1]
+
+def test_pinned_by_borrow(get_user):
+    user = get_user
+    friend = user.friend_by_id(1)
+    borrow = Borrow(user)
+    borrow.who = friend
+    borrow.what = Belonging(user, 'umbrella')
+    del friend
+    for friend_id in range(2, 6):
+        user.friend_by_id(friend_id)
+    gc.collect()
+    assert user.friend_by_id(1) is borrow.who
+    assert user.fetched == [1, 2, 3, 4, 5]
+
+def test_resync_keeps_instances(get_user, cache):
+    user = get_user
+    cache['borrowings'] = [
+        {'id': 1, 'what': 1, 'to_who': 1,
+         'when': '2020-01-10T09:00:00.000000Z', 'returned': None},
+        ]
+    user.load_cache(cache)
+    borrow = user.borrow_by_id(1)
+    cache['friends'][0]['name'] = 'John Smith'
+    user.load_cache(cache)
+    assert user.borrow_by_id(1) is borrow
+    assert user.friend_by_id(1) is borrow.who
+    assert borrow.who.name == 'John Smith'
+    assert user.fetched == []
@@ -0,0 +1,168 @@
+import time
+from datetime import datetime as dt
+
+import pytest
+from conftest import CACHE, FakeApplication
+from journal import Journal, Rejected, WriteBehind
+from mintal import User
+
+
+class RejectingApplication(FakeApplication):
+    """application which rejects borrowing of some belongings."""
+
+    def __init__(self, cache):
+        super().__init__(cache)
+        self.rejecting = set()
+
+    def post(self, url, data=None, headers=None, raise_rejected=False):
+        if self.online and data['what'] in self.rejecting:
+            raise Rejected('400 Client Error: Bad Request')
+        return super().post(url, data, headers, raise_rejected)
+
+
+@pytest.fixture
+def application(cache):
+    return RejectingApplication(cache)
+
+@pytest.fixture
+def get_user(application, tmp_path):
+    def make_user(cache=CACHE):
+        user = User()
+        user.load_cache(cache)
+        user._get_data_post = application.post
+        user._get_data_patch = application.patch
+        user.write_behind(str(tmp_path / 'journal'), interval=60)
+        return user
+    return make_user
+
+def test_borrow_updates_memory(get_user, application):
+    user = get_user()
+    friend = user.friend_by_id(1)
+    belonging = user.belonging_by_id(1)
+    borrow = user.borrow_to(friend, belonging, dt(2020, 1, 12, 20, 15))
+    assert belonging.borrowed
+    assert borrow.who is friend
+    assert application.requests == []
+    user.borrow_return(borrow)
+    assert not belonging.borrowed
+    assert user.close()
+    assert borrow.id == 1
+    assert application.requests[1][:2] \
+           == ('patch', 'http://localhost:8000/api/v1/borrowings/1/')
+
+def test_journal_replay(get_user, application):
+    application.online = False
+    user = get_user()
+    borrow = user.borrow_to(user.friend_by_id(1), user.belonging_by_id(1))
+    user.borrow_return(borrow)
+    assert not user.close()
+    application.online = True
+    user = get_user()
+    assert user.flush()
+    assert [request[0] for request in application.requests] \
+           == ['post', 'patch']
+    assert user.borrow_by_id(1).returned is not None
+
+def test_pushed_borrow_in_timeline(get_user):
+    user = get_user()
+    moment = dt(2020, 1, 20)
+    assert user.lent_count(moment) == 0
+    borrow = user.borrow_to(user.friend_by_id(1), user.belonging_by_id(1),
+                            dt(2020, 1, 12, 20, 15))
+    # borrow gets into timeline with its id
+    assert user.lent_count(moment) == 0
+    assert user.flush()
+    assert user.lent_at(moment) == [borrow]
+
+def test_journal_replay_offline(get_user, application):
+    application.online = False
+    user = get_user()
+    borrow = user.borrow_to(user.friend_by_id(1), user.belonging_by_id(1))
+    user.borrow_return(borrow)
+    user.close()
+    # restart without local cache while application is unreachable
+    user = get_user({})
+    belonging = user.belonging_by_id(1)
+    assert belonging.name == 'umbrella'
+    assert not belonging.borrowed
+    assert not user.close()
+    application.online = True
+    user = get_user({})
+    assert user.flush()
+    assert user.borrow_by_id(1).returned is not None
+
+def test_rejected_change(get_user, application):
+    application.rejecting.add(1)
+    user = get_user()
+    friend = user.friend_by_id(1)
+    umbrella = user.belonging_by_id(1)
+    hammer = user.belonging_by_id(2)
+    borrow = user.borrow_to(friend, umbrella)
+    user.borrow_return(borrow)
+    user.borrow_to(friend, hammer)
+    assert hammer.borrowed
+    assert user.flush()
+    # change behind rejected one is pushed
+    assert [request[0] for request in application.requests] == ['post']
+    assert hammer.borrowed
+    assert not umbrella.borrowed
+    assert borrow.returned is None
+    rejected = user.rejected_changes()
+    assert [change['entry']['operation'] for change in rejected] \
+           == ['borrow', 'return']
+    # dead letters survive restart
+    user.close()
+    user = get_user()
+    assert len(user.rejected_changes()) == 2
+    user.forget_rejected_changes()
+    assert user.rejected_changes() == []
+
+def test_torn_write(tmp_path):
+    path = str(tmp_path / 'journal')
+    journal = Journal(path)
+    journal.append('borrow', {'what': 1})
+    with open(path, 'a', encoding='utf-8') as journal_file:
+        journal_file.write('{"key": "torn", "oper')
+    journal = Journal(path)
+    assert len(journal) == 1
+    journal.append('borrow', {'what': 2})
+    journal.append('borrow', {'what': 3})
+    journal = Journal(path)
+    assert [entry['data']['what'] for entry in journal.pending()] \
+           == [1, 2, 3]
+
+def test_flusher_survives_error(tmp_path):
+    sent = []
+
+    def send(entry):
+        if not sent:
+            sent.append(None)
+            raise KeyError('friend')
+        sent.append(entry['key'])
+        return len(sent)
+    write_behind = WriteBehind(str(tmp_path / 'journal'), send, None,
+                               batch_size=1, interval=0.01)
+    write_behind.start()
+    entry = write_behind.append('borrow', {'what': 1})
+    for _ in range(100):
+        if not len(write_behind.journal):
+            break
+        time.sleep(0.01)
+    assert write_behind._thread.is_alive()
+    assert sent == [None, entry['key']]
+    assert write_behind.close()
+
+def test_pushed_borrow_failed_locally(get_user, application):
+    user = get_user()
+    borrow = user.borrow_to(user.friend_by_id(1), user.belonging_by_id(1))
+    application.things['borrowings'] = {}
+
+    def post(url, data=None, headers=None, raise_rejected=False):
+        reply = application.post(url, data, headers, raise_rejected)
+        # friend which isn't known and can't be fetched
+        return dict(reply, to_who=7)
+    user._get_data_post = post
+    assert user.flush()
+    assert borrow.id == 1
+    assert user.borrow_by_id(1) is borrow
+    assert len(application.requests) == 1
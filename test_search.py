@@ -0,0 +1,96 @@
+import random
+import statistics
+import string
+from time import perf_counter
+
+import pytest
+from mintal import User
+from search import NameIndex
+
+NAMES_NUMBER = 100000
+QUERY_LIMIT = 0.001
+
+CACHE = {
+    'friends': [
+        {'id': 1, 'name': 'John Doe', 'has_overdue': False},
+        {'id': 2, 'name': 'Johnny Storm', 'has_overdue': False},
+        {'id': 3, 'name': 'Sam Wilson', 'has_overdue': False},
+        ],
+    'belongings': [{'id': 1, 'name': 'Johnson guitar', 'is_borrowed': True}],
+    'borrowings': [
+        {'id': 1, 'what': 1, 'to_who': 2,
+         'when': '2020-01-12T17:15:00.000000Z', 'returned': None},
+        ],
+    }
+
+
+@pytest.fixture
+def get_user():
+    user = User()
+    user.load_cache(CACHE)
+    return user
+
+def test_search_prefix(get_user):
+    user = get_user
+    # Johnny Storm borrowed a guitar, so he is the first one
+    assert [friend.id for friend in user.search('joh', 'friend')] == [2, 1]
+    assert user.search('wil') == [user.friend_by_id(3)]
+    assert user.search('guitar') == [user.belonging_by_id(1)]
+
+def test_search_fuzzy(get_user):
+    user = get_user
+    assert user.search('Sam Wilsno')[0] is user.friend_by_id(3)
+
+def test_search_rename(get_user):
+    user = get_user
+    user.friend_by_id(3).name = 'Falcon'
+    assert user.search('wilson') == []
+    assert user.search('falc') == [user.friend_by_id(3)]
+
+@pytest.fixture(scope='module')
+def big_index():
+    random.seed(1)
+    index = NameIndex()
+    for number in range(NAMES_NUMBER):
+        name = ' '.join(
+            ''.join(random.choices(string.ascii_lowercase, k=6))
+            for _ in range(2)
+            )
+        index.add(('friend', number), name)
+        if number % 10 == 0:
+            index.touch(('friend', number), random.random())
+    return index
+
+def test_search_first_query(big_index):
+    # nothing is built on the first keystroke
+    started = perf_counter()
+    big_index.search('j')
+    assert perf_counter() - started < QUERY_LIMIT
+
+@pytest.mark.parametrize('length', [1, 2, 3, 5])
+def test_search_speed(big_index, length):
+    queries = [''.join(random.choices(string.ascii_lowercase, k=length))
+               for _ in range(200)]
+    timings = []
+    for query in queries:
+        started = perf_counter()
+        found = big_index.search(query)
+        timings.append(perf_counter() - started)
+        if length == 1:
+            assert len(found) == 10
+    assert statistics.median(timings) < QUERY_LIMIT
+
+def test_search_short_ranked():
+    index = NameIndex()
+    index.add(1, 'Sam Wilson')
+    index.add(2, 'Wanda Maximoff')
+    index.add(3, 'Scott Lang')
+    index.touch(3, 10)
+    assert index.search('s') == [3, 1]
+    assert index.search('w') == [2, 1]
+    index.touch(1, 20)
+    assert index.search('s') == [1, 3]
+    index.add(1, 'Falcon')
+    assert index.search('s') == [3]
+    index.discard(3)
+    assert index.search('s') == []
@@ -0,0 +1,67 @@
+from datetime import datetime as dt
+
+import pytest
+from mintal import User
+
+
+@pytest.fixture
+def cache(cache):
+    cache['belongings'][0]['is_borrowed'] = True
+    cache['borrowings'].append(
+        {'id': 1, 'what': 1, 'to_who': 1,
+         'when': '2020-01-12T17:15:00.000000Z', 'returned': None}
+        )
+    return cache
+
+@pytest.fixture
+def get_user(cache, application):
+    user = User()
+    user.load_cache(cache)
+    user._get_data_patch = application.patch
+    return user
+
+def patches(application):
+    return [(url, data) for method, url, data in application.requests
+            if method == 'patch']
+
+def test_session_minimal_patch(get_user, application):
+    user = get_user
+    with user.session():
+        friend = user.friend_by_id(1)
+        friend.name = 'James Barnes'
+        friend.name = 'Bucky Barnes'
+        user.friend_by_id(2).name = 'Sam Wilson'
+        borrow = user.borrow_by_id(1)
+        borrow.returned = dt(2020, 2, 1, 12, 0)
+    assert sorted(patches(application)) == [
+        ('http://localhost:8000/api/v1/borrowings/1/',
+         {'returned': '2020-02-01T09:00:00.000000Z'}),
+        ('http://localhost:8000/api/v1/friends/1/',
+         {'name': 'Bucky Barnes'}),
+        ]
+    assert borrow.returned.strftime('%Y-%m-%d %H:%M') == '2020-02-01 12:00'
+
+def test_session_rollback(get_user, application):
+    user = get_user
+    with pytest.raises(ValueError):
+        with user.session():
+            user.belonging_by_id(1).borrowed = False
+            raise ValueError
+    assert user.belonging_by_id(1).borrowed
+    assert patches(application) == []
+
+def test_loading_is_not_change(get_user, cache):
+    user = get_user
+    with user.session() as session:
+        user.load_cache(cache)
+        assert session.dirty() == {}
+
+def test_session_rollback_name(get_user):
+    user = get_user
+    friend = user.friend_by_id(2)
+    with pytest.raises(ValueError):
+        with user.session():
+            friend.name = 'Falcon'
+            raise ValueError
+    assert user.search('wilson') == [friend]
+    assert user.search('falcon') == []
@@ -0,0 +1,62 @@
+import pytest
+from mintal import User
+
+
+@pytest.fixture
+def get_user(application, tmp_path):
+    def make_user():
+        user = User()
+        user._get_data_get = application.get
+        user._get_data_post = application.post
+        user.use_shared_cache(str(tmp_path / 'shared.sqlite'),
+                              refresh_interval=0)
+        return user
+    return make_user
+
+def gets(application):
+    return [request for request in application.requests
+            if request[0] == 'get']
+
+def test_shared_lookup(get_user, application):
+    first, second = get_user(), get_user()
+    first.friend_by_id(1)
+    assert second.friend_by_id(1).name == 'John Doe'
+    assert second.friend_by_id(1) is second.friend_by_id(1)
+    assert len(gets(application)) == 1
+
+def test_write_invalidates(get_user, application):
+    first, second = get_user(), get_user()
+    belonging = second.belonging_by_id(1)
+    assert not belonging.borrowed
+    application.things['belongings'][1]['is_borrowed'] = True
+    borrow = first.borrow_to(first.friend_by_id(1), first.belonging_by_id(1))
+    # belonging is reloaded in place, borrow comes from shared cache
+    assert second.belonging_by_id(1) is belonging
+    assert belonging.borrowed
+    # the first process fetches changed friend and shares it
+    first.friend_by_id(1)
+    fetched = len(gets(application))
+    assert second.borrow_by_id(borrow.id).what is belonging
+    assert len(gets(application)) == fetched
+
+def test_stale_only_loaded(get_user):
+    first, second = get_user(), get_user()
+    second.friend_by_id(1)
+    for belonging_id in (1, 2):
+        first.belonging_by_id(belonging_id)
+        first._share_written(first.belonging_by_id(belonging_id))
+    first._share_written(first.friend_by_id(1))
+    second._refresh_shared()
+    assert second._stale == {'friend:1'}
+
+def test_refresh_interval(get_user, application, tmp_path):
+    first = get_user()
+    second = User()
+    second._get_data_get = application.get
+    second.use_shared_cache(str(tmp_path / 'shared.sqlite'),
+                            refresh_interval=60)
+    friend = second.friend_by_id(1)
+    first._share_written(first.friend_by_id(1))
+    # change is seen only after interval
+    assert second.friend_by_id(1) is friend
+    assert not second._stale
@@ -0,0 +1,50 @@
+import pytest
+from mintal import User
+from snapshot import Snapshot, write_snapshot
+
+CACHE = {
+    'friends': [
+        {'id': 2, 'name': 'Sam Wilson', 'has_overdue': False},
+        {'id': 1, 'name': 'John Doe', 'has_overdue': True},
+        ],
+    'belongings': [{'id': 1, 'name': 'зонтик', 'is_borrowed': True}],
+    'borrowings': [
+        {'id': 1, 'what': 1, 'to_who': 1,
+         'when': '2020-01-12T17:15:00.000000Z', 'returned': None},
+        ],
+    }
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    user = User()
+    user.load_cache(CACHE)
+    path = str(tmp_path / 'snapshot')
+    write_snapshot(user, path)
+    return path
+
+def test_snapshot_views(snapshot_path):
+    snapshot = Snapshot(snapshot_path)
+    assert snapshot.number_friends() == 2
+    assert [friend.name for friend in snapshot.friends()] \
+           == ['John Doe', 'Sam Wilson']
+    assert snapshot.friend_by_id(1).overdue
+    borrow = snapshot.borrow_by_id(1)
+    assert borrow.what.name == 'зонтик'
+    assert borrow.who.name == 'John Doe'
+    assert borrow.when.strftime('%Y-%m-%d %H:%M') == '2020-01-12 20:15'
+    assert borrow.returned is None
+    with pytest.raises(KeyError):
+        snapshot.friend_by_id(3)
+
+def test_snapshot_refresh(snapshot_path):
+    snapshot = Snapshot(snapshot_path)
+    old_friend = snapshot.friend_by_id(2)
+    assert not snapshot.refresh()
+    user = User()
+    user.load_cache(CACHE)
+    user._friends[2]._name = 'Bucky Barnes'
+    write_snapshot(user, snapshot_path)
+    assert snapshot.refresh()
+    assert snapshot.friend_by_id(2).name == 'Bucky Barnes'
+    assert old_friend.name == 'Sam Wilson'
@@ -0,0 +1,148 @@
+import datetime
+import random
+import statistics
+from datetime import datetime as dt
+from time import perf_counter
+
+import pytest
+from mintal import User
+from timeline import Timeline
+
+BORROWINGS_NUMBER = 100000
+QUERY_LIMIT = 0.005
+
+CACHE = {
+    'friends': [
+        {'id': 1, 'name': 'John Doe', 'has_overdue': False},
+        {'id': 2, 'name': 'Sam Wilson', 'has_overdue': False},
+        ],
+    'belongings': [
+        {'id': 1, 'name': 'umbrella', 'is_borrowed': False},
+        {'id': 2, 'name': 'hammer', 'is_borrowed': True},
+        ],
+    'borrowings': [
+        {'id': 1, 'what': 1, 'to_who': 1,
+         'when': '2020-01-10T09:00:00.000000Z',
+         'returned': '2020-01-12T09:00:00.000000Z'},
+        {'id': 2, 'what': 2, 'to_who': 2,
+         'when': '2020-01-11T09:00:00.000000Z', 'returned': None},
+        ],
+    }
+
+
+@pytest.fixture
+def get_user():
+    user = User()
+    user.load_cache(CACHE)
+
+    def patch(url, data, headers=None):
+        reply = dict(CACHE['borrowings'][0])
+        reply['returned'] = '2020-01-11T09:00:00.000000Z'
+        return reply
+    user._get_data_patch = patch
+    return user
+
+def test_timeline_queries(get_user):
+    user = get_user
+    day = datetime.date(2020, 1, 12)
+    lent = user.lent_between(day, day + datetime.timedelta(days=1))
+    assert sorted(borrow.what.name for borrow in lent) \
+           == ['hammer', 'umbrella']
+    assert user.lent_at(dt(2020, 1, 10, 18, 0)) == [user.borrow_by_id(1)]
+    friend = user.friend_by_id(2)
+    assert user.lent_count(dt(2021, 1, 1), friend) == 1
+    assert user.max_lent(dt(2020, 1, 1), dt(2020, 2, 1)) == 2
+
+def test_timeline_return(get_user):
+    user = get_user
+    # timelines are built before return and are changed by it
+    user.lent_count(dt(2020, 1, 1))
+    user.borrow_return(user.borrow_by_id(1))
+    assert user.max_lent(dt(2020, 1, 1), dt(2020, 2, 1)) == 1
+    assert user.lent_on_day(datetime.date(2020, 1, 12)) \
+           == [user.borrow_by_id(2)]
+
+def test_timeline_not_returned():
+    timeline = Timeline(clock=lambda: 100)
+    timeline.add(1, 10)
+    timeline.add(2, 20, 150)
+    # borrow which isn't returned is lent till now
+    assert sorted(timeline.at(50)) == [1, 2]
+    assert timeline.at(120) == [2]
+    assert timeline.count_at(120) == 1
+    assert timeline.overlapping(100, 200) == [2]
+    assert timeline.max_concurrent(0, 200) == 2
+    assert timeline.max_concurrent(100, 200) == 1
+
+def test_timeline_brute_force():
+    random.seed(2)
+    now = 900
+    timeline = Timeline(clock=lambda: now)
+    intervals = {}
+    for borrow_id in range(1, 300):
+        start = random.randint(0, 1000)
+        end = random.choice([None, start + random.randint(0, 100)])
+        timeline.add(borrow_id, start, end)
+        intervals[borrow_id] = (start, now if end is None else end)
+    for borrow_id in random.sample(sorted(intervals), 50):
+        timeline.discard(borrow_id)
+        del intervals[borrow_id]
+    for borrow_id in random.sample(sorted(intervals), 50):
+        start = random.randint(0, 1000)
+        end = start + random.randint(0, 100)
+        timeline.add(borrow_id, start, end)
+        intervals[borrow_id] = (start, end)
+    for _ in range(100):
+        low = random.randint(0, 1100)
+        high = low + random.randint(1, 200)
+        assert sorted(timeline.at(low)) == sorted(
+            borrow_id for borrow_id, (start, end) in intervals.items()
+            if start <= low < end
+            )
+        assert timeline.count_at(low) == len(timeline.at(low))
+        assert sorted(timeline.overlapping(low, high)) == sorted(
+            borrow_id for borrow_id, (start, end) in intervals.items()
+            if start < high and end > low and start < end
+            )
+        assert timeline.max_concurrent(low, high) == max(
+            sum(1 for start, end in intervals.values()
+                if start <= moment < end)
+            for moment in range(low, high)
+            )
+
+def test_timeline_add_many():
+    random.seed(4)
+    borrowings = []
+    for borrow_id in range(1, 300):
+        start = random.randint(0, 1000)
+        end = random.choice([None, start + random.randint(0, 100)])
+        borrowings.append((borrow_id, start, end))
+    one_by_one = Timeline(clock=lambda: 900)
+    for borrow_id, start, end in borrowings:
+        one_by_one.add(borrow_id, start, end)
+    at_once = Timeline(clock=lambda: 900)
+    at_once.add_many(borrowings)
+    for timeline in (one_by_one, at_once):
+        timeline.add(1, 0, 1100)
+    for low in range(0, 1100, 7):
+        assert sorted(at_once.at(low)) == sorted(one_by_one.at(low))
+        assert at_once.max_concurrent(low, low + 50) \
+               == one_by_one.max_concurrent(low, low + 50)
+
+def test_timeline_speed():
+    random.seed(3)
+    timeline = Timeline()
+    borrowings = []
+    for borrow_id in range(BORROWINGS_NUMBER):
+        start = random.uniform(0, 1e9)
+        borrowings.append((borrow_id, start, start + random.uniform(0, 1e6)))
+    timeline.add_many(borrowings)
+    timings = []
+    for borrow_id in range(BORROWINGS_NUMBER, BORROWINGS_NUMBER + 100):
+        started = perf_counter()
+        timeline.add(borrow_id, random.uniform(0, 1e9))
+        moment = random.uniform(0, 1e9)
+        timeline.at(moment)
+        timeline.max_concurrent(moment, moment + 1e7)
+        timings.append(perf_counter() - started)
+    assert statistics.median(timings) < QUERY_LIMIT
@@ -0,0 +1,98 @@
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from conftest import FakeResponse
+from mintal import User
+from transfer import PageSizer
+
+FRIENDS_NUMBER = 200
+DEFAULT_PAGE_SIZE = 5
+
+
+class PagedApplication:
+    """paginated friends list like application makes."""
+
+    def __init__(self, max_page_size=100):
+        self.max_page_size = max_page_size
+        self.pages = []
+
+    def get(self, url, param=None):
+        query = {key: int(value[0])
+                 for key, value in parse_qs(urlparse(url).query).items()}
+        query.update(param or {})
+        page = query.get('page', 1)
+        page_size = min(query.get('page_size', DEFAULT_PAGE_SIZE),
+                        self.max_page_size)
+        self.pages.append(page_size)
+        start = (page - 1) * page_size
+        reply = [
+            {'id': number, 'name': f'friend {number}', 'has_overdue': False}
+            for number in range(start + 1,
+                                min(start + page_size, FRIENDS_NUMBER) + 1)
+            ]
+        links = {}
+        if start + page_size < FRIENDS_NUMBER:
+            links['next'] = {
+                'url': f'{url.split("?")[0]}?page={page + 1}'
+                       f'&page_size={page_size}',
+                }
+        return FakeResponse(reply, links)
+
+
+class IgnoringApplication(PagedApplication):
+    """application which doesn't take page_size from client."""
+
+    def get(self, url, param=None):
+        url = url.split('&')[0]
+        param = {key: value for key, value in (param or {}).items()
+                 if key != 'page_size'}
+        return super().get(url, param)
+
+
+@pytest.mark.parametrize('max_page_size', [100, 30])
+def test_adaptive_page_size(max_page_size):
+    application = PagedApplication(max_page_size)
+    user = User()
+    user._get_data_get = application.get
+    user.get_all_friends()
+    stats = user.transfer_stats['friend']
+    assert user.number_friends() == FRIENDS_NUMBER
+    assert stats.items == FRIENDS_NUMBER
+    assert stats.round_trips == len(application.pages)
+    assert stats.saved_round_trips > 0
+    assert max(application.pages) <= max_page_size
+
+def test_page_sizer_bounds():
+    sizer = PageSizer(min_size=5, max_size=50, target_bytes=1000)
+    assert sizer.update(5, 100, 0.01) == 10
+    assert sizer.update(10, 200, 0.01) == 20
+    # 100 bytes of one thing, not more than 10 things fit
+    assert sizer.update(20, 2000, 0.01) == 10
+    assert sizer.update(10, 100, 5.0) == 5
+
+def test_max_page_size_is_not_kept():
+    application = PagedApplication(30)
+    user = User()
+    user._get_data_get = application.get
+    user.get_all_friends()
+    assert user.page_sizers['friend'].max_size == 100
+    application.max_page_size = 100
+    application.pages = []
+    user.get_all_friends()
+    assert max(application.pages) > 30
+
+def test_page_size_ignored():
+    application = IgnoringApplication()
+    user = User()
+    user._get_data_get = application.get
+    user.get_all_friends()
+    stats = user.transfer_stats['friend']
+    assert user.number_friends() == FRIENDS_NUMBER
+    # one page is requested to find out that page_size is ignored
+    assert stats.round_trips == FRIENDS_NUMBER // DEFAULT_PAGE_SIZE + 1
+    assert stats.saved_round_trips == -1
+    user.get_all_friends()
+    stats = user.transfer_stats['friend']
+    assert stats.round_trips == FRIENDS_NUMBER // DEFAULT_PAGE_SIZE
+    assert stats.saved_round_trips == 0
+    assert 'belonging' not in user.page_sizers
@@ -0,0 +1,386 @@
+"""
+timeline of borrowings: which borrowings were lent at some moment.
+
+Borrow is interval [when, returned) or [when, now) if it isn't returned,
+'now' is taken at the moment of query. Intervals and moments where
+quantity of lent borrowings changes are kept in treaps (randomized
+balanced trees), so adding, changing and dropping of borrow as well as
+every query take O(log n), listing takes O(log n) for every found borrow.
+Borrowings which aren't returned are kept apart: they end at different
+moment for every query.
+"""
+
+import datetime
+import random
+import time
+from collections import Counter
+
+from datetools import local_datetime
+
+
+def timestamp(moment):
+    """timestamp of moment, naive moment is in application timezone."""
+    if isinstance(moment, (int, float)):
+        return moment
+    if not isinstance(moment, datetime.datetime):
+        # whole date means its beginning
+        moment = datetime.datetime.combine(moment, datetime.time())
+    return local_datetime(moment).timestamp()
+
+
+def day_range(day):
+    """beginning of day and of the next day."""
+    return timestamp(day), timestamp(day + datetime.timedelta(days=1))
+
+
+class _Node:
+    __slots__ = ('key', 'value', 'priority', 'left', 'right', 'total', 'top')
+
+    def __init__(self, key, value):
+        self.key = key
+        self.value = value
+        self.priority = random.random()
+        self.left = None
+        self.right = None
+        self.update()
+
+
+class _IntervalNode(_Node):
+    """key is (start, borrow id), value is end, top is the latest end."""
+    __slots__ = ()
+
+    def update(self):
+        top = self.value
+        left, right = self.left, self.right
+        if left is not None and left.top > top:
+            top = left.top
+        if right is not None and right.top > top:
+            top = right.top
+        self.top = top
+
+
+class _ChangeNode(_Node):
+    """
+    key is moment, value is change of quantity of lent borrowings,
+    total is sum of changes, top is maximum sum of the first changes.
+    """
+    __slots__ = ()
+
+    def update(self):
+        left, right = self.left, self.right
+        if left is None:
+            total = top = self.value
+        else:
+            total = left.total + self.value
+            top = left.top if left.top > total else total
+        if right is not None:
+            if total + right.top > top:
+                top = total + right.top
+            total += right.total
+        self.total = total
+        self.top = top
+
+
+def _merge(left, right):
+    """merge trees, all keys of left are less than keys of right."""
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        left.update()
+        return left
+    right.left = _merge(left, right.left)
+    right.update()
+    return right
+
+
+def _split(node, key, inclusive=False):
+    """split tree into keys less than key (or equal if inclusive)
+    and the others."""
+    if node is None:
+        return None, None
+    if node.key < key or (inclusive and node.key == key):
+        left, right = _split(node.right, key, inclusive)
+        node.right = left
+        node.update()
+        return node, right
+    left, right = _split(node.left, key, inclusive)
+    node.left = right
+    node.update()
+    return left, node
+
+
+class _Treap:
+    """treap of nodes with unique keys, nodes keep aggregates of subtree."""
+
+    def __init__(self):
+        self._root = None
+
+    def _find(self, key):
+        """get node with key or None and path to its place."""
+        path = []
+        node = self._root
+        while node is not None and node.key != key:
+            path.append(node)
+            node = node.left if key < node.key else node.right
+        return node, path
+
+    def _put(self, path, key, node):
+        """put node in place of key under path, update path."""
+        if path:
+            parent = path[-1]
+            if key < parent.key:
+                parent.left = node
+            else:
+                parent.right = node
+            for parent in reversed(path):
+                parent.update()
+        else:
+            self._root = node
+
+    def _update(self, path, node):
+        node.update()
+        for parent in reversed(path):
+            parent.update()
+
+    def _insert(self, node):
+        path = []
+        below = self._root
+        while below is not None and below.priority > node.priority:
+            path.append(below)
+            below = below.left if node.key < below.key else below.right
+        node.left, node.right = _split(below, node.key)
+        node.update()
+        self._put(path, node.key, node)
+
+    def _remove(self, key):
+        node, path = self._find(key)
+        if node is not None:
+            self._put(path, key, _merge(node.left, node.right))
+
+    def _build(self, nodes):
+        """build tree of nodes sorted by keys, tree should be empty."""
+        stack = []
+        for node in nodes:
+            last = None
+            while stack and stack[-1].priority < node.priority:
+                last = stack.pop()
+                last.update()
+            node.left = last
+            if stack:
+                stack[-1].right = node
+            stack.append(node)
+        for node in reversed(stack):
+            node.update()
+        if stack:
+            self._root = stack[0]
+
+
+class _Intervals(_Treap):
+    """intervals ordered by start."""
+
+    def add(self, borrow_id, start, end):
+        self._insert(_IntervalNode((start, borrow_id), end))
+
+    def add_many(self, intervals):
+        """add (borrow id, start, end) into empty tree."""
+        self._build(
+            _IntervalNode((start, borrow_id), end)
+            for borrow_id, start, end in sorted(
+                intervals, key=lambda interval: (interval[1], interval[0])
+                )
+            )
+
+    def discard(self, borrow_id, start):
+        self._remove((start, borrow_id))
+
+    def overlapping(self, start, end, inclusive=False):
+        """
+        ids of not empty intervals which start before end (or at end
+        if inclusive) and end after start.
+        """
+        found = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node is None or node.top <= start:
+                continue
+            stack.append(node.left)
+            node_start = node.key[0]
+            if node_start < end or (inclusive and node_start == end):
+                if node.value > start and node.value > node_start:
+                    found.append(node.key[1])
+                stack.append(node.right)
+        return found
+
+
+class _Changes(_Treap):
+    """changes of quantity of lent borrowings by moments."""
+
+    def add(self, moment, change):
+        node, path = self._find(moment)
+        if node is None:
+            if change:
+                self._insert(_ChangeNode(moment, change))
+        elif node.value + change:
+            node.value += change
+            self._update(path, node)
+        else:
+            self._put(path, moment, _merge(node.left, node.right))
+
+    def add_many(self, changes):
+        """add dict of changes by moments into empty tree."""
+        self._build(_ChangeNode(moment, changes[moment])
+                    for moment in sorted(changes) if changes[moment])
+
+    def count_at(self, moment):
+        """sum of changes made till moment inclusive."""
+        count = 0
+        node = self._root
+        while node is not None:
+            if node.key <= moment:
+                count += node.value
+                if node.left is not None:
+                    count += node.left.total
+                node = node.right
+            else:
+                node = node.left
+        return count
+
+    def max_count(self, start, end):
+        """maximum quantity during [start, end)."""
+        left, rest = _split(self._root, start, inclusive=True)
+        middle, right = _split(rest, end)
+        top = middle.top if middle is not None else 0
+        self._root = _merge(_merge(left, middle), right)
+        return self.count_at(start) + max(0, top)
+
+
+class Timeline:
+    """
+    intervals of borrowings by borrow id.
+
+    clock : function returning timestamp of now, time.time by default.
+    """
+
+    def __init__(self, clock=time.time):
+        self._clock = clock
+        self._intervals = {}
+        self._returned = _Intervals()
+        self._lent = _Intervals()
+        # changes of returned borrowings and of all of them,
+        # borrowings which aren't returned are never returned there
+        self._returned_changes = _Changes()
+        self._all_changes = _Changes()
+
+    def __len__(self):
+        return len(self._intervals)
+
+    def add(self, borrow_id, when, returned=None):
+        """add borrow or change its interval."""
+        start = timestamp(when)
+        end = None if returned is None else timestamp(returned)
+        if self._intervals.get(borrow_id) == (start, end):
+            return
+        self.discard(borrow_id)
+        self._intervals[borrow_id] = (start, end)
+        if end is None:
+            self._lent.add(borrow_id, start, float('inf'))
+        else:
+            self._returned.add(borrow_id, start, end)
+        self._count(start, end, 1)
+
+    def discard(self, borrow_id):
+        interval = self._intervals.pop(borrow_id, None)
+        if interval is not None:
+            start, end = interval
+            if end is None:
+                self._lent.discard(borrow_id, start)
+            else:
+                self._returned.discard(borrow_id, start)
+            self._count(start, end, -1)
+
+    def add_many(self, borrowings):
+        """
+        add borrowings faster than one by one.
+
+        borrowings : iterable of (borrow id, when, returned).
+        """
+        if self._intervals:
+            for borrow_id, when, returned in borrowings:
+                self.add(borrow_id, when, returned)
+            return
+        all_changes = Counter()
+        returned_changes = Counter()
+        for borrow_id, when, returned in borrowings:
+            start = timestamp(when)
+            end = None if returned is None else timestamp(returned)
+            self._intervals[borrow_id] = (start, end)
+            all_changes[start] += 1
+            if end is not None:
+                all_changes[end] -= 1
+                returned_changes[start] += 1
+                returned_changes[end] -= 1
+        self._returned.add_many(
+            (borrow_id, start, end)
+            for borrow_id, (start, end) in self._intervals.items()
+            if end is not None
+            )
+        self._lent.add_many(
+            (borrow_id, start, float('inf'))
+            for borrow_id, (start, end) in self._intervals.items()
+            if end is None
+            )
+        self._all_changes.add_many(all_changes)
+        self._returned_changes.add_many(returned_changes)
+
+    def _count(self, start, end, sign):
+        """count borrow in (sign 1) or out (sign -1) of changes."""
+        self._all_changes.add(start, sign)
+        if end is not None:
+            self._all_changes.add(end, -sign)
+            self._returned_changes.add(start, sign)
+            self._returned_changes.add(end, -sign)
+
+    def count_at(self, moment):
+        """quantity of borrowings lent at moment."""
+        moment = timestamp(moment)
+        if moment < self._clock():
+            return self._all_changes.count_at(moment)
+        return self._returned_changes.count_at(moment)
+
+    def at(self, moment):
+        """ids of borrowings lent at moment."""
+        moment = timestamp(moment)
+        found = self._returned.overlapping(moment, moment, True)
+        if moment < self._clock():
+            found += self._lent.overlapping(moment, moment, True)
+        return found
+
+    def overlapping(self, start, end):
+        """ids of borrowings lent at any moment of [start, end)."""
+        start, end = timestamp(start), timestamp(end)
+        found = self._returned.overlapping(start, end)
+        now = self._clock()
+        if start < now:
+            found += self._lent.overlapping(start, min(end, now))
+        return found
+
+    def on_day(self, day):
+        """ids of borrowings lent at any moment of day (date)."""
+        return self.overlapping(*day_range(day))
+
+    def max_concurrent(self, start, end):
+        """maximum quantity of borrowings lent at once during [start, end)."""
+        start, end = timestamp(start), timestamp(end)
+        now = self._clock()
+        found = 0
+        if start < now:
+            found = self._all_changes.max_count(start, min(end, now))
+        if end > now:
+            found = max(found, self._returned_changes.max_count(
+                max(start, now), end
+                ))
+        return found
@@ -0,0 +1,109 @@
+"""
+transfer tuning for paginated requests to 'rental':
+adaptive page size and transfer statistics.
+"""
+
+import math
+
+MIN_PAGE_SIZE = 5
+MAX_PAGE_SIZE = 100
+# time of one page and size of one page aimed by PageSizer
+TARGET_TIME = 0.5
+TARGET_BYTES = 256 * 1024
+
+
+def wire_size(response):
+    """get quantity of bytes of response body got over network."""
+    raw = getattr(response, 'raw', None)
+    try:
+        size = raw.tell()
+    except (AttributeError, TypeError, ValueError):
+        size = 0
+    return size or len(response.content)
+
+
+class PageSizer:
+    """
+    choose page size from measured time and payload of pages.
+
+    Page is doubled while it comes fast and is small, and is halved when
+    it comes too long or is too big, always within min_size, max_size
+    (bounds allowed by application). Sizer is turned off by 'ignored'
+    when application doesn't take page size from client.
+    """
+
+    def __init__(self, min_size=MIN_PAGE_SIZE, max_size=MAX_PAGE_SIZE,
+                 target_time=TARGET_TIME, target_bytes=TARGET_BYTES):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_time = target_time
+        self.target_bytes = target_bytes
+        self.page_size = None
+        self.ignored = False
+
+    def _bound(self, page_size, max_size):
+        return max(self.min_size, min(max_size, page_size))
+
+    def update(self, items, payload_bytes, elapsed, max_size=None):
+        """
+        take measures of page, return page size for next page.
+
+        max_size : maximum page size for this page if application allows
+        less than self.max_size.
+        """
+        if not items:
+            return self.page_size
+        page_size = self.page_size or items
+        item_bytes = payload_bytes / items
+        if elapsed > self.target_time or payload_bytes > self.target_bytes:
+            page_size //= 2
+        elif (elapsed < self.target_time / 2
+              and payload_bytes < self.target_bytes / 2):
+            page_size *= 2
+        if item_bytes:
+            page_size = min(page_size, int(self.target_bytes // item_bytes))
+        if max_size is None:
+            max_size = self.max_size
+        self.page_size = self._bound(page_size, min(max_size, self.max_size))
+        return self.page_size
+
+
+class TransferStats:
+    """statistics of one sync of things."""
+
+    def __init__(self):
+        self.round_trips = 0
+        self.items = 0
+        self.wire_bytes = 0
+        self.content_bytes = 0
+        self.default_page_size = None
+
+    def __str__(self):
+        return (f'{self.items} items, {self.round_trips} round trips '
+                f'({self.saved_round_trips} saved), {self.wire_bytes} bytes '
+                f'({self.saved_bytes} saved)')
+
+    def add(self, response, items):
+        """take page of response with quantity of items."""
+        self.round_trips += 1
+        self.items += items
+        self.wire_bytes += wire_size(response)
+        self.content_bytes += len(response.content)
+        if self.default_page_size is None:
+            self.default_page_size = items
+
+    @property
+    def saved_bytes(self):
+        """bytes saved by compression."""
+        return self.content_bytes - self.wire_bytes
+
+    @property
+    def saved_round_trips(self):
+        """
+        round trips saved against default page size of application,
+        negative if more round trips were made.
+        """
+        if not self.default_page_size:
+            return 0
+        default_trips = math.ceil(self.items / self.default_page_size)
+        return default_trips - self.round_trips